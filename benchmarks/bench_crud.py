@@ -0,0 +1,102 @@
+# bench_crud.py
+"""
+db/crud.py against an in-memory Mongo stand-in (mongomock), or a real server.
+
+mongomock implements only part of the aggregation language ($type and
+$size are missing), so the pipeline updates behind answer submission
+(update_answer_and_get_next, update_answers_and_get_next,
+append_questions) cannot run there; they are recorded as
+{"skipped": ...} in the results. Pass --mongo-uri with a throwaway server
+(e.g. mongod --storageEngine inMemory) to time them too; the suite works
+in its own databases and drops them afterwards.
+
+mongomock is in the "bench" dependency group (uv run --group bench ...).
+"""
+import db.crud as crud
+from models.question import QAItem, UserQA
+
+DB_NAME = "valoov_bench"
+REPORT_DB_NAME = "valoov_bench_report"
+QUESTIONS = 47
+MONGOMOCK_SKIP = "pipeline update unsupported by mongomock; run with --mongo-uri"
+
+
+def _connect(mongo_uri: str = None):
+    if mongo_uri:
+        from pymongo import MongoClient
+        return MongoClient(mongo_uri)
+    try:
+        import mongomock
+        import mongomock.gridfs
+    except ImportError:
+        raise RuntimeError("The crud suite needs mongomock (uv run --group bench ...) or --mongo-uri")
+    mongomock.gridfs.enable_gridfs_integration()
+    return mongomock.MongoClient()
+
+
+def run(runner, mongo_uri: str = None):
+    client = _connect(mongo_uri)
+    client.drop_database(DB_NAME)
+    client.drop_database(REPORT_DB_NAME)
+    # crud imports the handles by name, so the suite swaps them on the module
+    original = crud.db, crud.report_db
+    crud.db, crud.report_db = client[DB_NAME], client[REPORT_DB_NAME]
+    try:
+        _run(runner, pipelines=bool(mongo_uri))
+    finally:
+        crud.db, crud.report_db = original
+        client.drop_database(DB_NAME)
+        client.drop_database(REPORT_DB_NAME)
+        client.close()
+
+
+def _run(runner, pipelines: bool):
+    # On mongomock the pipeline updates are recorded as skipped instead of timed
+    bench = runner.bench if pipelines else lambda name, func, setup=None, **params: runner.skip(name, MONGOMOCK_SKIP, **params)
+    user_qa = UserQA(user_id="bench-user", qas=[QAItem(question=f"Question {i}?") for i in range(QUESTIONS)])
+    runner.bench(f"crud.save_user_qa[{QUESTIONS}q]", lambda: crud.save_user_qa(user_qa, "bench-pdf"), questions=QUESTIONS)
+    bench("crud.update_answer_and_get_next", lambda: crud.update_answer_and_get_next(
+        "bench-user", "bench-pdf", 0, "An answer"), questions=QUESTIONS)
+    answers = [(i, f"Answer {i}") for i in range(10)]
+    bench("crud.update_answers_and_get_next[10]", lambda: crud.update_answers_and_get_next(
+        "bench-user", "bench-pdf", answers), questions=QUESTIONS, answers=len(answers))
+    runner.bench("crud.get_user_qa_by_pdf", lambda: crud.get_user_qa_by_pdf("bench-pdf"), questions=QUESTIONS)
+    # Growing documents are reset before every round by the setup callable
+    generation = {}
+    bench("crud.append_questions[5]", lambda: crud.append_questions(
+        "bench-append", "bench-append-pdf", generation["append"], [f"Extra {i}?" for i in range(5)]), questions=5,
+        setup=lambda: generation.update(append=crud.save_user_qa(UserQA(user_id="bench-append", qas=user_qa.qas), "bench-append-pdf")))
+
+    # Plain and zlib blobs; GridFS only starts at PDF_TEXT_GRIDFS_MIN_BYTES of compressed text
+    sizes = {"plain": crud.PDF_TEXT_COMPRESS_MIN_BYTES // 2, "zlib": 1024 * 1024}
+    for encoding, size in sizes.items():
+        text = ("Revenue grew 30% year over year. " * (size // 33 + 1))[:size]
+        pdf_hash = f"bench-{encoding}"
+        runner.bench(f"crud.save_pdf_blob[{encoding}]", lambda text=text, pdf_hash=pdf_hash: crud.save_pdf_blob(pdf_hash, text),
+                     text_bytes=size)
+        runner.bench(f"crud.get_pdf_blob_text[{encoding}]", lambda pdf_hash=pdf_hash: crud.get_pdf_blob_text(pdf_hash),
+                     text_bytes=size)
+    runner.bench("crud.save_pdf_text", lambda: crud.save_pdf_text("bench-user", "bench-zlib"))
+    pdf_id = crud.save_pdf_text("bench-user", "bench-zlib")
+    runner.bench("crud.get_pdf_doc[zlib]", lambda: crud.get_pdf_doc(pdf_id), text_bytes=sizes["zlib"])
+    runner.bench("crud.get_pdf_doc[projection]", lambda: crud.get_pdf_doc(pdf_id, {"pdf_hash": 1}))
+
+    forecast = "| **Revenue** | 1,000,000.00 | 1,300,000.00 | 1,690,000.00 |\n" * 15
+    crud.start_forecast_thread("bench-pdf", "Create the forecast.", forecast)
+    runner.bench("crud.start_forecast_thread", lambda: crud.start_forecast_thread("bench-restart", "Create the forecast.", forecast))
+    runner.bench("crud.append_forecast_revision", lambda: crud.append_forecast_revision("bench-revise", "Raise growth.", forecast),
+                 setup=lambda: crud.start_forecast_thread("bench-revise", "Create the forecast.", forecast))
+    runner.bench("crud.get_forecast_thread[window=3]", lambda: crud.get_forecast_thread("bench-pdf", window=3))
+    crud.approve_forecast(pdf_id, forecast)
+    runner.bench("crud.get_approved_forecast_messages", lambda: crud.get_approved_forecast_messages("bench-pdf"))
+    runner.bench("crud.save_valuation_results", lambda: crud.save_valuation_results(
+        pdf_id, "bench-user", {"final_weighted_valuation": 2_500_000, "summary": "Bench valuation"}))
+
+    for _ in range(3):
+        crud.report_db.pdf_texts.insert_one({"user_id": "bench-user", "pdf_text": "Bench text. " * 2000})
+        crud.report_db.user_qas.insert_one({"user_id": "bench-user", "user_qa": user_qa.model_dump()})
+    report_id = crud.report_db.user_qa.insert_one({"eval_text": "Eval " * 500, "pdf_text": "Text " * 5000}).inserted_id
+    runner.bench("crud.get_user_context", lambda: crud.get_user_context("bench-user"), documents=3)
+    runner.bench("crud.get_report_inputs", lambda: crud.get_report_inputs(report_id))
+    runner.bench("crud.push_report_result", lambda: crud.push_report_result("bench-user", {"persona": "Bench", "text": "Result"}),
+                 setup=lambda: crud.report_db.report_data.delete_many({"user_id": "bench-user"}))
@@ -0,0 +1,23 @@
+# bench_pdf.py
+"""
+PDF text extraction on synthetic documents of 1, 50 and 500 pages.
+"""
+import io
+
+from core.pdf_utils import extract_text_from_pdf, hash_pdf_bytes, shutdown_process_pool
+from core.config import PDF_PARALLEL_MIN_PAGES
+from loadtest.pdfgen import synthetic_pdf
+
+PAGE_COUNTS = (1, 50, 500)
+
+
+def run(runner):
+    try:
+        for pages in PAGE_COUNTS:
+            pdf = synthetic_pdf(pages)
+            rounds = 3 if pages >= PDF_PARALLEL_MIN_PAGES else None
+            runner.bench(f"pdf.extract_text_from_pdf[{pages}p]", lambda pdf=pdf: extract_text_from_pdf(io.BytesIO(pdf)),
+                         rounds=rounds, pages=pages, pdf_bytes=len(pdf), parallel=pages >= PDF_PARALLEL_MIN_PAGES)
+            runner.bench(f"pdf.hash_pdf_bytes[{pages}p]", lambda pdf=pdf: hash_pdf_bytes(pdf), pages=pages, pdf_bytes=len(pdf))
+    finally:
+        shutdown_process_pool()
@@ -0,0 +1,91 @@
+# bench_valuation.py
+"""
+Valuation math: DCFCalculator and every method of the deterministic valuation.
+"""
+import numpy as np
+
+from benchmarks.harness import quiet
+from core.FCFFprojection import DCFCalculator
+from core.startup_valuation import CHECKLIST_FIELDS, SCORECARD_FIELDS, run_valuation_methods
+from core.valuation_methods import (
+    calculate_checklist_valuation,
+    calculate_dcf_ltg_valuation,
+    calculate_dcf_multiple_valuation,
+    calculate_final_weighted_valuation,
+    calculate_scorecard_valuation,
+    calculate_vc_method_valuation,
+    get_typical_roi_for_stage,
+    get_valuation_weights,
+)
+
+YEARS = 5
+REVENUES = [1_000_000 * 1.3 ** year for year in range(YEARS)]
+PROJECTION = {
+    "revenues": REVENUES,
+    "cost_of_goods_sold": [value * 0.4 for value in REVENUES],
+    "operating_expenses": [value * 0.3 for value in REVENUES],
+    "depreciation_amortization": [value * 0.05 for value in REVENUES],
+    "capex": [value * 0.08 for value in REVENUES],
+    "change_in_net_working_capital": [value * 0.02 for value in REVENUES],
+}
+FREE_CASH_FLOWS = [150_000, 210_000, 280_000, 360_000, 450_000]
+SURVIVAL_RATES = [0.9, 0.85, 0.8, 0.75, 0.7]
+FINAL_YEAR_EBITDA = 850_000
+
+INPUTS = {
+    "business_stage": "Startup",
+    "average_pre_money_valuation": 2_000_000,
+    "strength_of_team_score": 1.2,
+    "size_of_opportunity_score": 1.1,
+    "product_service_ip_score": 1.0,
+    "competitive_environment_score": 0.9,
+    "strategic_relationships_score": 1.0,
+    "funding_requirement_score": 1.0,
+    "max_valuation_assumption": 3_000_000,
+    "idea_quality_score": 70,
+    "product_ip_score": 60,
+    "core_team_score": 80,
+    "operating_stage_score": 50,
+    "strategic_relations_score": 40,
+    "survival_rates": SURVIVAL_RATES,
+    "discount_rate": 0.25,
+    "long_term_growth_rate": 0.03,
+    "industry_multiple": 8,
+    "exit_multiple": 6,
+    "years_to_exit": 5,
+    "capital_raised": 500_000,
+}
+
+
+def run(runner):
+    for method, options in (("gordon_growth", {"terminal_growth_rate": 0.03}), ("exit_multiple", {"exit_multiple": 8.0})):
+        calculator = DCFCalculator(YEARS, discount_rate=0.12, tax_rate=0.25, terminal_value_method=method, **options)
+        runner.bench(f"dcf.calculate_dcf_valuation[{method}]", lambda calculator=calculator: calculator.calculate_dcf_valuation(**PROJECTION),
+                     terminal_value_method=method, years=YEARS)
+
+    calculator = DCFCalculator(YEARS, discount_rate=0.12, tax_rate=0.25, terminal_growth_rate=0.03)
+    for scenarios in (1_000, 100_000):
+        rng = np.random.default_rng(0)
+        batch = {name: np.asarray(values) * rng.uniform(0.8, 1.2, (scenarios, 1)) for name, values in PROJECTION.items()}
+        runner.bench(f"dcf.calculate_dcf_valuation_batch[{scenarios}]", lambda batch=batch: calculator.calculate_dcf_valuation_batch(**batch),
+                     scenarios=scenarios, years=YEARS)
+
+    with quiet():
+        weights = get_valuation_weights(INPUTS["business_stage"])
+    scorecard = {key: INPUTS[key] for key in SCORECARD_FIELDS}
+    checklist = {key: INPUTS[key] for key in CHECKLIST_FIELDS}
+    valuations = {"Scorecard": 2_100_000, "Checklist": 1_800_000, "DCF w/ LTG": 2_400_000,
+                  "DCF w/ Multiple": 2_600_000, "VC Method": 1_500_000}
+
+    runner.bench("valuation.get_valuation_weights", lambda: get_valuation_weights(INPUTS["business_stage"]))
+    runner.bench("valuation.calculate_scorecard_valuation", lambda: calculate_scorecard_valuation(**scorecard))
+    runner.bench("valuation.calculate_checklist_valuation", lambda: calculate_checklist_valuation(**checklist))
+    runner.bench("valuation.calculate_dcf_ltg_valuation", lambda: calculate_dcf_ltg_valuation(
+        FREE_CASH_FLOWS, SURVIVAL_RATES, INPUTS["discount_rate"], INPUTS["long_term_growth_rate"]))
+    runner.bench("valuation.calculate_dcf_multiple_valuation", lambda: calculate_dcf_multiple_valuation(
+        FREE_CASH_FLOWS, SURVIVAL_RATES, INPUTS["discount_rate"], FINAL_YEAR_EBITDA, INPUTS["industry_multiple"]))
+    runner.bench("valuation.get_typical_roi_for_stage", lambda: get_typical_roi_for_stage(INPUTS["business_stage"]))
+    runner.bench("valuation.calculate_vc_method_valuation", lambda: calculate_vc_method_valuation(
+        FINAL_YEAR_EBITDA, INPUTS["exit_multiple"], 1.1474, INPUTS["years_to_exit"], INPUTS["capital_raised"]))
+    runner.bench("valuation.calculate_final_weighted_valuation", lambda: calculate_final_weighted_valuation(valuations, weights))
+    runner.bench("valuation.run_valuation_methods", lambda: run_valuation_methods(INPUTS, FREE_CASH_FLOWS, FINAL_YEAR_EBITDA))
@@ -0,0 +1,168 @@
+# harness.py
+"""
+Timing, environment capture and comparison for the benchmark suites.
+"""
+import contextlib
+import io
+import math
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+
+class Runner:
+    """
+    Times callables and collects their statistics by name.
+
+    Each benchmark is calibrated so one round takes at least `min_time`
+    seconds, then timed for `rounds` rounds. Standard output is swallowed
+    while timing, since the valuation methods print on every call.
+    """
+
+    def __init__(self, rounds: int = 7, min_time: float = 0.1, warmup: int = 1, filter: str = None):
+        self.rounds = rounds
+        self.min_time = min_time
+        self.warmup = warmup
+        self.filter = filter
+        self.results = {}
+
+    def bench(self, name: str, func, rounds: int = None, setup=None, **params):
+        """
+        Time `func()` and record its statistics under `name`.
+
+        Args:
+            name (str): Benchmark name, e.g. "dcf.calculate_dcf_valuation[gordon]"
+            func (callable): Zero-argument callable to time
+            rounds (int, optional): Override the runner's round count (for slow cases)
+            setup (callable, optional): Untimed reset run before every round, for calls that grow their document
+            **params: Parameters stored alongside the result (sizes, methods)
+
+        Returns:
+            dict: The recorded result, or None if the name is filtered out
+        """
+        if self.filter and self.filter not in name:
+            return None
+        rounds = rounds or self.rounds
+        try:
+            with quiet():
+                if setup:
+                    setup()
+                for _ in range(self.warmup):
+                    func()
+                started = time.perf_counter()
+                func()
+                once = time.perf_counter() - started
+                number = max(1, math.ceil(self.min_time / once)) if once > 0 else 1000
+                timings = []
+                for _ in range(rounds):
+                    if setup:
+                        setup()
+                    started = time.perf_counter()
+                    for _ in range(number):
+                        func()
+                    timings.append((time.perf_counter() - started) / number)
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"[:300], "params": params}
+            print(f"{name:<55} skipped ({result['error'][:80]})")
+            self.results[name] = result
+            return result
+
+        mean = statistics.fmean(timings)
+        result = {
+            "mean_s": mean,
+            "median_s": statistics.median(timings),
+            "min_s": min(timings),
+            "max_s": max(timings),
+            "stdev_s": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            "ops_per_s": 1 / mean if mean else None,
+            "rounds": rounds,
+            "iterations": number,
+            "params": params,
+        }
+        print(f"{name:<55} {format_seconds(result['median_s']):>12} median  {format_seconds(result['min_s']):>12} min")
+        self.results[name] = result
+        return result
+
+    def skip(self, name: str, reason: str, **params):
+        """
+        Record that `name` was not measured in this environment, so the results
+        file lists it rather than silently leaving it out.
+
+        Returns:
+            dict: The recorded entry, or None if the name is filtered out
+        """
+        if self.filter and self.filter not in name:
+            return None
+        result = {"skipped": reason, "params": params}
+        print(f"{name:<55} not measured ({reason})")
+        self.results[name] = result
+        return result
+
+
+def quiet():
+    """Swallow standard output, e.g. while preparing benchmark inputs."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    """Commit and machine the results were measured on."""
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> list:
+    """
+    Compare the median times of two result files.
+
+    Args:
+        baseline (dict): Results loaded from the older JSON file
+        current (dict): Results loaded from the newer JSON file
+        threshold (float): Relative change beyond which a benchmark counts as a regression or improvement
+
+    Returns:
+        list: (name, baseline_s, current_s, ratio, verdict) per benchmark present in both files
+    """
+    rows = []
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        # Entries with an error or marked skipped have no timings
+        if not old or "median_s" not in old or "median_s" not in result:
+            continue
+        ratio = result["median_s"] / old["median_s"] if old["median_s"] else math.inf
+        if ratio > 1 + threshold:
+            verdict = "slower"
+        elif ratio < 1 - threshold:
+            verdict = "faster"
+        else:
+            verdict = ""
+        rows.append((name, old["median_s"], result["median_s"], ratio, verdict))
+    return rows
+
+
+def print_comparison(rows: list):
+    print(f"{'benchmark':<55}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for name, old, new, ratio, verdict in rows:
+        print(f"{name:<55}{format_seconds(old):>12}{format_seconds(new):>12}{ratio:>8.2f}  {verdict}")
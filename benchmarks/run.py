@@ -0,0 +1,94 @@
+# run.py
+"""
+Micro-benchmarks for the valuation math and data paths.
+
+Suites:
+
+- ``valuation``: DCFCalculator (single and batch) and every valuation method
+- ``pdf``: extract_text_from_pdf on synthetic 1/50/500-page PDFs
+- ``crud``: db/crud.py against mongomock (``uv run --group bench``), or
+  --mongo-uri; the pipeline updates mongomock cannot run are recorded as
+  skipped and only timed against a server
+
+Results are written as JSON (default benchmarks/results/<commit>.json)
+with the commit and machine they were measured on, so two commits can be
+compared::
+
+    python -m benchmarks.run
+    git checkout other-branch && python -m benchmarks.run --output other.json
+    python -m benchmarks.run --compare benchmarks/results/<commit>.json --output-only
+
+Compare runs from the same machine only.
+"""
+import argparse
+import json
+import os
+
+# Never touch the configured (production) cluster: db/mongodb.py connects at import time
+os.environ["MONGODB_URI"] = "mongodb://127.0.0.1:27017"
+
+from benchmarks.harness import Runner, compare, environment, print_comparison
+
+SUITES = ("valuation", "pdf", "crud")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def run_suite(name: str, runner: Runner, args):
+    print(f"== {name}")
+    if name == "valuation":
+        from benchmarks import bench_valuation
+        bench_valuation.run(runner)
+    elif name == "pdf":
+        from benchmarks import bench_pdf
+        bench_pdf.run(runner)
+    elif name == "crud":
+        from benchmarks import bench_crud
+        bench_crud.run(runner, mongo_uri=args.mongo_uri)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the micro-benchmarks and save the results as JSON")
+    parser.add_argument("--suites", default=",".join(SUITES), help="Comma-separated suites to run")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1, help="Minimum seconds per round; fast calls are repeated")
+    parser.add_argument("--mongo-uri", help="Run the crud suite against this server instead of mongomock")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change reported as slower/faster")
+    parser.add_argument("--output-only", action="store_true", help="With --compare, compare --output (or the "
+                                                                     "current commit's file) without re-running")
+    args = parser.parse_args()
+
+    meta = environment()
+    output = args.output or os.path.join(RESULTS_DIR, f"{(meta['commit'] or 'unknown')[:12]}.json")
+
+    if args.output_only:
+        with open(output) as f:
+            current = json.load(f)
+    else:
+        suites = [name.strip() for name in args.suites.split(",") if name.strip()]
+        unknown = set(suites) - set(SUITES)
+        if unknown:
+            parser.error(f"Unknown suites: {', '.join(sorted(unknown))}")
+        runner = Runner(rounds=args.rounds, min_time=args.min_time, filter=args.filter)
+        for name in suites:
+            run_suite(name, runner, args)
+        meta["settings"] = {"rounds": args.rounds, "min_time": args.min_time, "suites": suites,
+                            "mongo": "server" if args.mongo_uri else "mongomock"}
+        current = {"meta": meta, "results": runner.results}
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nBaseline {(baseline['meta'].get('commit') or 'unknown')[:12]} vs "
+              f"current {(current['meta'].get('commit') or 'unknown')[:12]}")
+        print_comparison(compare(baseline, current, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
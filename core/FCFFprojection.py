@@ -1,12 +1,31 @@
 import numpy as np
 import pandas as pd
-import openai
 import os
 import json
-from db.mongodb import db
+import asyncio
+from db.crud import (
+    get_pdf_doc,
+    get_user_qa_by_pdf,
+    get_forecast_thread,
+    get_approved_forecast_messages,
+    start_forecast_thread,
+    append_forecast_revision,
+    save_forecast_state,
+    approve_forecast,
+)
 from bson import ObjectId
 from dotenv import load_dotenv
 import sys
+from core.config import FCFF_EDIT_WINDOW, FCFF_SUMMARY_MAX_CHARS
+from core.llm_gateway import chat_completion
+from core.prompt_builder import fit_context
+from core.retrieval import retrieve
+
+# Passages the forecast needs: historical financials, costs, growth and capital spending
+FCFF_RETRIEVAL_QUERY = (
+    "revenue sales growth cost of goods sold gross margin operating expenses ebitda depreciation "
+    "capex capital expenditure working capital tax cash flow forecast projection balance sheet"
+)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -22,8 +41,8 @@ def get_pdf_text(pdfid: str) -> str:
         str: The extracted text from the PDF
     """
     try:
-        pdf_doc = db.pdf_texts.find_one({"_id": ObjectId(pdfid)})
-        pdf_question = db.user_qas.find_one({"pdf_id": pdfid})
+        pdf_doc = get_pdf_doc(pdfid)
+        pdf_question = get_user_qa_by_pdf(pdfid)
         if not pdf_doc:
             raise ValueError(f"No PDF found with ID: {pdfid}")
         return pdf_doc, pdf_question
@@ -87,29 +106,26 @@ class DCFCalculator:
         self.present_value_of_terminal_value = None
         self.total_npv = None
 
-    def _calculate_fcff(self,
-                        revenues: list,
-                        cost_of_goods_sold: list,
-                        operating_expenses: list,
-                        depreciation_amortization: list,
-                        capex: list,
-                        change_in_net_working_capital: list
-                       ) -> pd.DataFrame:
+    def _fcff_components(self,
+                         revenues,
+                         cost_of_goods_sold,
+                         operating_expenses,
+                         depreciation_amortization,
+                         capex,
+                         change_in_net_working_capital
+                        ) -> dict:
         """
-        Calculates Free Cash Flow to the Firm (FCFF) for each forecast year,
-        including detailed breakdown of EBITDA and PP&E.
+        Computes every FCFF line item with NumPy. Inputs may be 1-D (one scenario)
+        or 2-D (scenarios x years); the last axis is always the forecast year.
         """
-        if not (len(revenues) == len(cost_of_goods_sold) == len(operating_expenses) ==
-                len(depreciation_amortization) == len(capex) == len(change_in_net_working_capital) ==
-                self.projection_horizon_years):
+        inputs = [np.asarray(values, dtype=float) for values in (
+            revenues, cost_of_goods_sold, operating_expenses,
+            depreciation_amortization, capex, change_in_net_working_capital
+        )]
+        if any(values.shape != inputs[0].shape for values in inputs) or \
+                inputs[0].shape[-1] != self.projection_horizon_years:
             raise ValueError("All input lists for FCFF calculation must match the projection horizon length.")
-
-        revenues = np.array(revenues, dtype=float)
-        cost_of_goods_sold = np.array(cost_of_goods_sold, dtype=float)
-        operating_expenses = np.array(operating_expenses, dtype=float)
-        depreciation_amortization = np.array(depreciation_amortization, dtype=float)
-        capex = np.array(capex, dtype=float)
-        change_in_net_working_capital = np.array(change_in_net_working_capital, dtype=float)
+        revenues, cost_of_goods_sold, operating_expenses, depreciation_amortization, capex, change_in_net_working_capital = inputs
 
         gross_profit = revenues - cost_of_goods_sold
         ebitda = gross_profit - operating_expenses
@@ -118,20 +134,11 @@ class DCFCalculator:
 
         fcff = nopat + depreciation_amortization - capex - change_in_net_working_capital
 
-        net_ppe = [0.0] * self.projection_horizon_years
-        gross_ppe = [0.0] * self.projection_horizon_years
-
-        net_ppe_prev = self.initial_ppe
-        gross_ppe_prev = self.initial_ppe
-
-        for i in range(self.projection_horizon_years):
-            net_ppe[i] = net_ppe_prev + capex[i] - depreciation_amortization[i]
-            gross_ppe[i] = gross_ppe_prev + capex[i]
-
-            net_ppe_prev = net_ppe[i]
-            gross_ppe_prev = gross_ppe[i]
+        # PP&E roll-forward as running sums from the opening balance
+        net_ppe = self.initial_ppe + np.cumsum(capex - depreciation_amortization, axis=-1)
+        gross_ppe = self.initial_ppe + np.cumsum(capex, axis=-1)
 
-        fcff_df = pd.DataFrame({
+        return {
             'Revenues': revenues,
             'Cost of Goods Sold': cost_of_goods_sold,
             'Gross Profit': gross_profit,
@@ -145,9 +152,27 @@ class DCFCalculator:
             'FCFF': fcff,
             'Net PP&E': net_ppe,
             'Gross PP&E': gross_ppe
-        }, index=self.forecast_years)
+        }
 
-        return fcff_df
+    def _calculate_fcff(self,
+                        revenues: list,
+                        cost_of_goods_sold: list,
+                        operating_expenses: list,
+                        depreciation_amortization: list,
+                        capex: list,
+                        change_in_net_working_capital: list
+                       ) -> pd.DataFrame:
+        """
+        Calculates Free Cash Flow to the Firm (FCFF) for each forecast year,
+        including detailed breakdown of EBITDA and PP&E.
+        """
+        components = self._fcff_components(
+            revenues, cost_of_goods_sold, operating_expenses,
+            depreciation_amortization, capex, change_in_net_working_capital
+        )
+        if components['FCFF'].ndim != 1:
+            raise ValueError("_calculate_fcff expects a single scenario; use calculate_dcf_valuation_batch.")
+        return pd.DataFrame(components, index=self.forecast_years)
 
     def _calculate_terminal_value(self, fcff_df: pd.DataFrame) -> float:
         """
@@ -165,46 +190,302 @@ class DCFCalculator:
         
         return terminal_value
 
+    def _discount_factors(self) -> np.ndarray:
+        return discount_factors(self.discount_rate, self.projection_horizon_years)
+
     def calculate_dcf_valuation(self,
                                 revenues: list,
                                 cost_of_goods_sold: list,
                                 operating_expenses: list,
                                 depreciation_amortization: list,
                                 capex: list,
-                                change_in_net_working_capital: list
+                                change_in_net_working_capital: list,
+                                verbose: bool = False
                                ) -> tuple[float, pd.DataFrame]:
         """
         Performs the full DCF valuation and stores results internally.
-        Only prints the FCFF table.
+        Prints the FCFF table only when verbose is True.
         """
         self.fcff_df = self._calculate_fcff(
             revenues, cost_of_goods_sold, operating_expenses,
             depreciation_amortization, capex, change_in_net_working_capital
         )
-        print("\n---")
-        print("## Free Cash Flow to the Firm (FCFF) Projections")
-        print(self.fcff_df.round(2).to_string(formatters={col: '{:,.2f}'.format for col in self.fcff_df.columns}))
-        print("---\n")
+        if verbose:
+            print("\n---")
+            print("## Free Cash Flow to the Firm (FCFF) Projections")
+            print(self.fcff_df.round(2).to_string(formatters={col: '{:,.2f}'.format for col in self.fcff_df.columns}))
+            print("---\n")
 
         self.terminal_value = self._calculate_terminal_value(self.fcff_df)
 
-        present_value_of_fcff_list = []
-        for i, year_fcff in enumerate(self.fcff_df['FCFF']):
-            pv = year_fcff / ((1 + self.discount_rate)**(i + 1))
-            present_value_of_fcff_list.append(pv)
-        self.present_value_of_explicit_fcff = sum(present_value_of_fcff_list)
+        factors = self._discount_factors()
+        self.present_value_of_explicit_fcff = float(self.fcff_df['FCFF'].to_numpy() @ factors)
 
-        self.present_value_of_terminal_value = self.terminal_value / ((1 + self.discount_rate)**self.projection_horizon_years)
+        self.present_value_of_terminal_value = self.terminal_value * factors[-1]
 
         self.total_npv = self.present_value_of_explicit_fcff + self.present_value_of_terminal_value
 
-        # The rest of the detailed output for TV and PV calculations is suppressed as requested.
-        # However, the values are stored in self.terminal_value, self.present_value_of_explicit_fcff, etc.
+        # The detailed TV and PV values are stored in self.terminal_value, self.present_value_of_explicit_fcff, etc.
         # You can access them directly from the DCFCalculator object after running this method.
         # For example: print(dcf_val.total_npv)
 
         return self.total_npv, self.fcff_df
 
+    def calculate_dcf_valuation_batch(self,
+                                      revenues,
+                                      cost_of_goods_sold,
+                                      operating_expenses,
+                                      depreciation_amortization,
+                                      capex,
+                                      change_in_net_working_capital,
+                                      return_dataframes: bool = False
+                                     ) -> dict:
+        """
+        Values many scenarios in one vectorized pass.
+
+        Args:
+            revenues, cost_of_goods_sold, operating_expenses, depreciation_amortization,
+            capex, change_in_net_working_capital: Arrays of shape (scenarios, years).
+                A 1-D array is treated as a single scenario.
+            return_dataframes (bool): Also build the per-scenario FCFF DataFrames (slow for large batches).
+
+        Returns:
+            dict: 'fcff', 'ebitda', 'net_ppe', 'gross_ppe' as (scenarios, years) arrays and
+                  'terminal_value', 'present_value_of_explicit_fcff', 'present_value_of_terminal_value',
+                  'total_npv' as (scenarios,) arrays; 'fcff_dfs' when return_dataframes is True.
+        """
+        components = self._fcff_components(*(
+            np.atleast_2d(np.asarray(values, dtype=float)) for values in (
+                revenues, cost_of_goods_sold, operating_expenses,
+                depreciation_amortization, capex, change_in_net_working_capital
+            )
+        ))
+        fcff = components['FCFF']
+        ebitda = components['EBITDA']
+
+        terminal_value = terminal_values(
+            fcff[:, -1], ebitda[:, -1], self.discount_rate,
+            terminal_growth_rate=self.terminal_growth_rate if self.terminal_value_method == "gordon_growth" else None,
+            exit_multiple=self.exit_multiple if self.terminal_value_method == "exit_multiple" else None
+        )
+        factors = self._discount_factors()
+        present_value_of_explicit_fcff = fcff @ factors
+        present_value_of_terminal_value = terminal_value * factors[-1]
+
+        result = {
+            'fcff': fcff,
+            'ebitda': ebitda,
+            'net_ppe': components['Net PP&E'],
+            'gross_ppe': components['Gross PP&E'],
+            'terminal_value': terminal_value,
+            'present_value_of_explicit_fcff': present_value_of_explicit_fcff,
+            'present_value_of_terminal_value': present_value_of_terminal_value,
+            'total_npv': present_value_of_explicit_fcff + present_value_of_terminal_value
+        }
+        if return_dataframes:
+            result['fcff_dfs'] = [
+                pd.DataFrame({name: values[i] for name, values in components.items()}, index=self.forecast_years)
+                for i in range(fcff.shape[0])
+            ]
+        return result
+
+# --- Vectorized DCF helpers ---
+def discount_factors(discount_rate, years: int) -> np.ndarray:
+    """
+    Returns 1 / (1 + r)^t for t = 1..years. A scalar rate gives shape (years,);
+    an array of rates gives shape rates.shape + (years,).
+    """
+    rate = np.asarray(discount_rate, dtype=float)
+    return np.power(1.0 + rate[..., None], -np.arange(1, years + 1, dtype=float))
+
+def terminal_values(final_year_fcff, final_year_ebitda, discount_rate, terminal_growth_rate=None, exit_multiple=None) -> np.ndarray:
+    """
+    Terminal value by Gordon growth (terminal_growth_rate) or exit multiple (exit_multiple),
+    broadcasting over all array arguments.
+    """
+    if terminal_growth_rate is not None:
+        growth = np.asarray(terminal_growth_rate, dtype=float)
+        return np.asarray(final_year_fcff, dtype=float) * (1 + growth) / (np.asarray(discount_rate, dtype=float) - growth)
+    if exit_multiple is not None:
+        return np.asarray(final_year_ebitda, dtype=float) * np.asarray(exit_multiple, dtype=float)
+    raise ValueError("Either terminal_growth_rate or exit_multiple is required.")
+
+# --- FCFF table parsing and sensitivity analysis ---
+# Metrics of the FCFF table shown to the user, and their display names
+FCFF_TABLE_METRICS = [
+    ("revenues", "Revenues"),
+    ("cost_of_goods_sold", "Cost of Goods Sold"),
+    ("gross_profit", "Gross Profit"),
+    ("operating_expenses", "Operating Expenses"),
+    ("ebitda", "EBITDA"),
+    ("depreciation_amortization", "Depreciation & Amortization"),
+    ("ebit", "EBIT"),
+    ("nopat", "NOPAT"),
+    ("capex", "CapEx"),
+    ("change_in_net_working_capital", "Change in Net Working Capital"),
+    ("fcff", "FCFF"),
+    ("net_ppe", "Net PP&E"),
+    ("gross_ppe", "Gross PP&E")
+]
+
+def _parse_table_number(cell: str):
+    cell = cell.strip().strip("*").replace(",", "").replace("$", "").replace("€", "").strip()
+    negative = cell.startswith("(") and cell.endswith(")")
+    try:
+        value = float(cell.strip("()"))
+    except ValueError:
+        return None
+    return -value if negative else value
+
+def parse_fcff_table(table: str) -> dict:
+    """
+    Parse a markdown FCFF table (as produced by perform_fcff_projection) into
+    {metric_key: [values per year]}. Rows with unknown names are ignored.
+    """
+    names = {name.lower(): key for key, name in FCFF_TABLE_METRICS}
+    names.update({key: key for key, _ in FCFF_TABLE_METRICS})
+    projections = {}
+    for line in table.splitlines():
+        cells = [cell.strip() for cell in line.strip().strip("|").split("|")]
+        if len(cells) < 2:
+            continue
+        key = names.get(cells[0].strip("*").strip().lower())
+        if not key:
+            continue
+        values = [_parse_table_number(cell) for cell in cells[1:] if cell]
+        if values and all(value is not None for value in values):
+            projections[key] = values
+    return projections
+
+def get_approved_forecast_table(pdfid: str):
+    """
+    Return the approved FCFF table for a PDF, or None if no forecast was approved yet.
+    """
+    pdf_doc = get_pdf_doc(pdfid, {"forecast_results": 1})
+    if pdf_doc and pdf_doc.get("forecast_results"):
+        return pdf_doc["forecast_results"]
+    messages = get_approved_forecast_messages(pdfid)
+    if messages:
+        for msg in reversed(messages):
+            if msg.get("role") == "assistant":
+                return msg.get("content")
+    return None
+
+def _summarize_edits(summary: str, edits: list, max_chars: int = FCFF_SUMMARY_MAX_CHARS) -> str:
+    """Fold edits that left the window into the running summary, keeping its newest lines."""
+    lines = [line for line in (summary or "").split("\n") if line]
+    lines += ["- " + " ".join(edit.split())[:200] for edit in edits]
+    while lines and len("\n".join(lines)) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)
+
+def _migrate_forecast_thread(pdfid: str, thread: dict, window: int = FCFF_EDIT_WINDOW) -> dict:
+    """Derive prompt/latest_forecast/summary for a thread saved before they were stored."""
+    messages = thread.get("messages") or []
+    user_msgs = [msg["content"] for msg in messages if msg.get("role") == "user"]
+    assistant_msgs = [msg["content"] for msg in messages if msg.get("role") == "assistant"]
+    edits = user_msgs[1:]
+    fields = {
+        "prompt": user_msgs[0] if user_msgs else "",
+        "latest_forecast": assistant_msgs[-1] if assistant_msgs else "",
+        "summary": _summarize_edits("", edits[:-window] if len(edits) > window else []),
+        "edit_count": len(edits),
+    }
+    save_forecast_state(pdfid, fields)
+    thread.update(fields)
+    thread["messages"] = messages[-2 * window:]
+    return thread
+
+def build_revision_messages(thread: dict, user_msg: str, window: int = FCFF_EDIT_WINDOW) -> list:
+    """
+    Messages for one revision turn: the forecast prompt, the latest forecast table
+    and the new request, preceded by the summary of older edits and the last
+    `window` edits. The size does not grow with the length of the conversation.
+    """
+    edit_count = thread.get("edit_count", 0)
+    user_msgs = [msg["content"] for msg in thread.get("messages") or [] if msg.get("role") == "user"]
+    recent = user_msgs[-min(edit_count, window):] if edit_count else []
+
+    history = []
+    if thread.get("summary"):
+        history.append("Earlier revision requests (summarised):\n" + thread["summary"])
+    if recent:
+        history.append("Recent revision requests:\n" + "\n".join(f"- {edit}" for edit in recent))
+    request = user_msg
+    if history:
+        request = "\n\n".join(history) + "\n\nAll of the above are already applied to the forecast. New request:\n" + user_msg
+    return [
+        {"role": "user", "content": thread.get("prompt", "")},
+        {"role": "assistant", "content": thread.get("latest_forecast", "")},
+        {"role": "user", "content": request},
+    ]
+
+def sensitivity_grid(fcff: list, ebitda: list, discount_rates: list,
+                     terminal_growth_rates: list = None, exit_multiples: list = None) -> dict:
+    """
+    Enterprise value for every (discount rate, terminal growth) and/or
+    (discount rate, exit multiple) pair in one broadcast NumPy call.
+
+    Returns:
+        dict: "wacc_x_growth" and/or "wacc_x_exit_multiple" grids with rows per
+              discount rate; cells where the discount rate does not exceed the
+              growth rate are None.
+    """
+    fcff = np.asarray(fcff, dtype=float)
+    ebitda = np.asarray(ebitda, dtype=float)
+    rates = np.asarray(discount_rates, dtype=float)
+    if np.any(rates <= 0):
+        raise ValueError("Discount rates must be positive.")
+    factors = discount_factors(rates, fcff.size)          # (rates, years)
+    present_value_of_explicit_fcff = factors @ fcff      # (rates,)
+    final_factor = factors[:, -1:]                       # (rates, 1)
+
+    result = {"discount_rates": rates.tolist()}
+    if terminal_growth_rates:
+        growth = np.asarray(terminal_growth_rates, dtype=float)[None, :]
+        spread = np.where(rates[:, None] > growth, rates[:, None] - growth, np.nan)
+        terminal_value = fcff[-1] * (1 + growth) / spread
+        grid = present_value_of_explicit_fcff[:, None] + terminal_value * final_factor
+        result["terminal_growth_rates"] = growth[0].tolist()
+        result["wacc_x_growth"] = [[None if np.isnan(v) else round(float(v), 2) for v in row] for row in grid]
+    if exit_multiples:
+        multiples = np.asarray(exit_multiples, dtype=float)[None, :]
+        terminal_value = terminal_values(fcff[-1], ebitda[-1], rates[:, None], exit_multiple=multiples)
+        grid = present_value_of_explicit_fcff[:, None] + terminal_value * final_factor
+        result["exit_multiples"] = multiples[0].tolist()
+        result["wacc_x_exit_multiple"] = [[round(float(v), 2) for v in row] for row in grid]
+    return result
+
+def perform_sensitivity_analysis(pdfid: str, discount_rates: list,
+                                 terminal_growth_rates: list = None, exit_multiples: list = None) -> dict:
+    """
+    Build the DCF sensitivity table from the approved FCFF projection, without any LLM call.
+
+    Args:
+        pdfid (str): The ID of the PDF whose forecast was approved
+        discount_rates (list): WACC values (rows)
+        terminal_growth_rates (list, optional): Long-term growth values (columns of the WACC x g grid)
+        exit_multiples (list, optional): EBITDA exit multiples (columns of the WACC x multiple grid)
+
+    Returns:
+        dict: The grids, or {"error": ...}
+    """
+    if not discount_rates or not (terminal_growth_rates or exit_multiples):
+        return {"error": "Provide discount_rates and terminal_growth_rates and/or exit_multiples"}
+    if not ObjectId.is_valid(pdfid):
+        return {"error": "Invalid PDF id"}
+    table = get_approved_forecast_table(pdfid)
+    if not table:
+        return {"error": "No approved FCFF projection found for this PDF"}
+    projections = parse_fcff_table(table)
+    if "fcff" not in projections or "ebitda" not in projections:
+        return {"error": "Approved FCFF projection is missing the FCFF or EBITDA row"}
+    try:
+        return sensitivity_grid(projections["fcff"], projections["ebitda"], discount_rates,
+                                terminal_growth_rates, exit_multiples)
+    except ValueError as e:
+        return {"error": str(e)}
+
 # --- WACC and Cost of Equity (CAPM) Calculation Functions ---
 def calculate_wacc(market_value_equity, market_value_debt, cost_of_equity, cost_of_debt, corporate_tax_rate):
     """
@@ -225,7 +506,7 @@ def calculate_cost_of_equity_capm(risk_free_rate, beta, market_risk_premium):
     return cost_of_equity
 
 # --- MAIN EXECUTION BLOCK ---
-def perform_fcff_projection(pdfid: str,userMSG:str) -> dict:
+async def perform_fcff_projection(pdfid: str,userMSG:str) -> dict:
     """
     Perform FCFF projection based on PDF text extracted from MongoDB.
     
@@ -239,57 +520,44 @@ def perform_fcff_projection(pdfid: str,userMSG:str) -> dict:
     # Extract PDF text from MongoDB
     try:
         messages = []
-        get_messages= db.forecast_msgs.find_one({"pdf_id": pdfid})
-        if get_messages and get_messages.get('messages'):
-            messages = get_messages.get('messages')
-            print("Messages found", messages)
-        elif get_messages and get_messages.get('approved'):
-            return {"fcff_table": get_messages.get('forecast_results'),"approved":True}
+        thread = get_forecast_thread(pdfid, window=FCFF_EDIT_WINDOW)
+        if thread and thread.get('messages'):
+            if 'prompt' not in thread:
+                # Thread saved before the windowed format; read its full history once
+                thread = _migrate_forecast_thread(pdfid, get_forecast_thread(pdfid))
+            messages = thread.get('messages')
+            print("Messages found", len(messages))
+        elif thread and thread.get('approved'):
+            return {"fcff_table": thread.get('forecast_results'),"approved":True}
         else:
             print("No messages found")
-        client = openai.OpenAI(
-                api_key=os.getenv("GEMINI_API_KEY"),
-                base_url="https://generativelanguage.googleapis.com/v1beta/openai"
-            )    
         if len(messages) > 0:
-            print("Messages found", messages)
             if not userMSG:
                 return {"error": "No user message found"}
             else:
                 print("User message", userMSG)
                 if userMSG.lower() == "approved":
-                    # Get the last assistant message which contains the forecast results
-                    last_assistant_message = None
-                    for msg in reversed(messages):
-                        if msg["role"] == "assistant":
-                            last_assistant_message = msg["content"]
-                            break
+                    # The latest forecast table is the one being approved
+                    last_assistant_message = thread.get('latest_forecast')
                     
                     if last_assistant_message:
                         # Update the pdf_texts collection with the forecast results
-                        db.pdf_texts.update_one(
-                            {"_id": ObjectId(pdfid)},
-                            {"$set": {"forecast_results": last_assistant_message}}
-                        )
-                        db.forecast_msgs.update_one(
-                            {"pdf_id": pdfid},
-                            {"$set": {"approved":True}}
-                        )
+                        approve_forecast(pdfid, last_assistant_message)
                         print("Forecast results saved to pdf_texts collection")
                         return {"fcff_table": last_assistant_message,"approved":True}
                 
-                messages.append({"role": "user", "content": userMSG})
-                print("Messages found", messages)
-
-                response = client.chat.completions.create(
-                    model="gemini-2.0-flash",
-                    messages=messages,
-                    temperature=0.1
-                )
-                print("Response", response)
+                # Only the prompt, the latest table and the recent edits are sent
+                revision_messages = build_revision_messages(thread, userMSG)
+                response = await chat_completion(revision_messages, model="gemini-2.0-flash", temperature=0.1, call_site="fcff_revision")
                 response_content = response.choices[0].message.content.strip()
-                messages.append({"role": "assistant", "content": response_content})
-                db.forecast_msgs.update_one({"pdf_id": pdfid}, {"$set": {"messages": messages}})
+
+                # The oldest recent edit leaves the window with this one; fold it into the summary
+                summary = None
+                edit_count = thread.get('edit_count', 0)
+                if edit_count >= FCFF_EDIT_WINDOW:
+                    user_msgs = [msg["content"] for msg in messages if msg.get("role") == "user"]
+                    summary = _summarize_edits(thread.get('summary'), user_msgs[-FCFF_EDIT_WINDOW:][:1])
+                append_forecast_revision(pdfid, userMSG, response_content, summary)
                 
                 # If user message is "approved", save the forecast results to pdf_texts collection
                 return {"fcff_table": response.choices[0].message.content,"approved":False}
@@ -304,9 +572,14 @@ def perform_fcff_projection(pdfid: str,userMSG:str) -> dict:
                 if not pdf_doc or not qa_doc:
                     return {"error": "No text content found in the PDF"}
                 
-                # Extract text and Q&A from documents
-                pdf_text = pdf_doc.get('text', '')
-                qa_data = qa_doc.get('qas', [])
+                # Extract text and Q&A from documents; indexed PDFs contribute only their financial passages
+                pdf_text = pdf_doc.get('pdf_text') or ''
+                if pdf_doc.get('pdf_hash'):
+                    # May load, chunk and index a document uploaded before indexing existed
+                    passages = await asyncio.to_thread(retrieve, pdf_doc['pdf_hash'], FCFF_RETRIEVAL_QUERY)
+                    if passages:
+                        pdf_text = "\n\n".join(passages)
+                qa_data = (qa_doc.get('user_qa') or {}).get('qas') or qa_doc.get('qas', [])
                 
                 # Format Q&A into a readable string
                 qa_text = ""
@@ -316,24 +589,21 @@ def perform_fcff_projection(pdfid: str,userMSG:str) -> dict:
                     if question and answer:
                         qa_text += f"Q: {question}\nA: {answer}\n\n"
                 
-                print("PDF Text:", pdf_text[:200] + "...")  # Print first 200 chars for debugging
-                print("QA Text:", qa_text[:200] + "...")    # Print first 200 chars for debugging
-                
             except Exception as e:
                 return {"error": f"Failed to extract PDF text: {str(e)}"}
 
-            # Set up API client
-         
+            # Answers first, then the financial sections of the document, within the prompt budget
+            context = fit_context(document_text=pdf_text, qa_text=qa_text, call_site="fcff_projection")
 
             # Create the financial forecast prompt
             forecast_prompt = f"""
             You are a financial analyst. Analyze the following company information and generate a 5-year financial forecast.
 
             COMPANY INFORMATION:
-            {pdf_text}
+            {context['document']}
 
             USER QUESTIONS AND ANSWERS:
-            {qa_text}
+            {context['qa']}
 
             Based on the above information, generate a financial forecast in the following JSON format:
             {{
@@ -375,18 +645,13 @@ def perform_fcff_projection(pdfid: str,userMSG:str) -> dict:
             """
 
             try:
-                messages.append({"role": "user", "content": forecast_prompt})
+                messages = [{"role": "user", "content": forecast_prompt}]
                 # Get the financial forecast from the LLM
-                response = client.chat.completions.create(
-                    model="gemini-2.0-flash",
-                    messages=messages,
-                    temperature=0.1
-                )
+                response = await chat_completion(messages, model="gemini-2.0-flash", temperature=0.1, call_site="fcff_projection")
               
 
                 # Get the response content and clean it
                 response_content = response.choices[0].message.content.strip()
-                print("Raw LLM Response:", response_content[:200] + "...")  # Print first 200 chars for debugging
                 
                 # Remove any markdown code block indicators if present
                 response_content = response_content.replace('```json', '').replace('```', '').strip()
@@ -427,25 +692,8 @@ def perform_fcff_projection(pdfid: str,userMSG:str) -> dict:
                 # Create the formatted table
                 formatted_table = [table_header, table_separator]
                 
-                # Define the metrics and their display names
-                metrics = [
-                    ("revenues", "Revenues"),
-                    ("cost_of_goods_sold", "Cost of Goods Sold"),
-                    ("gross_profit", "Gross Profit"),
-                    ("operating_expenses", "Operating Expenses"),
-                    ("ebitda", "EBITDA"),
-                    ("depreciation_amortization", "Depreciation & Amortization"),
-                    ("ebit", "EBIT"),
-                    ("nopat", "NOPAT"),
-                    ("capex", "CapEx"),
-                    ("change_in_net_working_capital", "Change in Net Working Capital"),
-                    ("fcff", "FCFF"),
-                    ("net_ppe", "Net PP&E"),
-                    ("gross_ppe", "Gross PP&E")
-                ]
-                
                 # Add each metric row
-                for metric_key, metric_name in metrics:
+                for metric_key, metric_name in FCFF_TABLE_METRICS:
                     values = forecast_data["projections"][metric_key]
                     row = f"| {metric_name:<30} |"
                     for value in values:
@@ -454,8 +702,7 @@ def perform_fcff_projection(pdfid: str,userMSG:str) -> dict:
 
                 # Join the table lines with newlines
                 formatted_output = "\n".join(formatted_table)
-                messages.append({"role": "assistant", "content": formatted_output})
-                db.forecast_msgs.update_one({"pdf_id": pdfid}, {"$set": {"messages": messages}},upsert=True)
+                start_forecast_thread(pdfid, forecast_prompt, formatted_output)
                 return {
                     "fcff_table": formatted_output,
                     "assumptions": forecast_data["assumptions"],
@@ -480,7 +727,8 @@ if __name__ == "__main__":
             print("Error: Please provide a PDF ID either as a command line argument or set PDF_ID environment variable")
             sys.exit(1)
 
-    result = perform_fcff_projection(pdfid)
+    import asyncio
+    result = asyncio.run(perform_fcff_projection(pdfid, ""))
     
     if "error" in result:
         print(f"\nERROR: {result['error']}")
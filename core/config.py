@@ -1,4 +1,75 @@
 import os
+from dotenv import load_dotenv
+
+load_dotenv()
 
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "your-gemini-api-key") 
\ No newline at end of file
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "your-gemini-api-key")
+
+# LLM gateway settings (shared async clients, see core/llm_gateway.py)
+GEMINI_OPENAI_BASE_URL = os.getenv("GEMINI_OPENAI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai")
+# Base URL of the native genai API; empty uses Google's default (point both at loadtest/mock_llm.py for load tests)
+GEMINI_API_BASE_URL = os.getenv("GEMINI_API_BASE_URL", "")
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# Upper bound on num_questions in /api/v1/questions/generate (beyond the fixed list the LLM adds the rest)
+MAX_QUESTIONS = int(os.getenv("MAX_QUESTIONS", "100"))
+
+# PDF extraction: documents with at least this many pages are split across a process pool
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "100"))
+PDF_MAX_WORKERS = int(os.getenv("PDF_MAX_WORKERS", "0")) # 0 = one worker per CPU
+
+# Report persona fan-out
+PERSONA_MAX_CONCURRENCY = int(os.getenv("PERSONA_MAX_CONCURRENCY", "6"))
+PERSONA_TIMEOUT_SECONDS = float(os.getenv("PERSONA_TIMEOUT_SECONDS", "90"))
+
+# LLM response cache (core/llm_cache.py)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Background jobs (core/jobs.py): "mongo" persists job status in the jobs collection, "memory" keeps it in-process
+JOB_BACKEND = os.getenv("JOB_BACKEND", "mongo")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX_SIZE = int(os.getenv("JOB_QUEUE_MAX_SIZE", "100"))
+# Each process renews the lease of its unfinished jobs every JOB_HEARTBEAT_SECONDS; jobs whose lease
+# has expired (their process died) are marked failed by whichever process notices first
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+
+# MongoDB connection pool (db/mongodb.py), shared by every module; 0 disables a timeout
+MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME", "valoov")
+MONGODB_REPORT_DB_NAME = os.getenv("MONGODB_REPORT_DB_NAME", "valoov_ai_db") # report inputs and persona output
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0"))
+# Use pymongo's native async client where a module supports it (currently the job store)
+MONGO_ASYNC_DRIVER = os.getenv("MONGO_ASYNC_DRIVER", "false").lower() in ("1", "true", "yes")
+# Create the indexes declared in db/indexes.py at startup
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() in ("1", "true", "yes")
+
+# PDF text storage (db/crud.py): zlib-compress blob text from this size, move it to GridFS from that compressed size
+PDF_TEXT_COMPRESS_MIN_BYTES = int(os.getenv("PDF_TEXT_COMPRESS_MIN_BYTES", "16384"))
+PDF_TEXT_GRIDFS_MIN_BYTES = int(os.getenv("PDF_TEXT_GRIDFS_MIN_BYTES", str(8 * 1024 * 1024)))
+
+# Token budget per LLM prompt (core/prompt_builder.py); larger documents are trimmed by priority
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "200000"))
+# The valuation agent resends its context on every turn, so it gets a much smaller budget of retrieved passages
+AGENT_CONTEXT_TOKEN_BUDGET = int(os.getenv("AGENT_CONTEXT_TOKEN_BUDGET", "16000"))
+
+# Per-document BM25 retrieval (core/retrieval.py)
+RETRIEVAL_CHUNK_CHARS = int(os.getenv("RETRIEVAL_CHUNK_CHARS", "1500"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "32")) # indexes kept in memory per process
+
+# FCFF forecast chat (core/FCFFprojection.py): user edits sent verbatim per revision, older ones are summarised
+FCFF_EDIT_WINDOW = int(os.getenv("FCFF_EDIT_WINDOW", "4"))
+FCFF_SUMMARY_MAX_CHARS = int(os.getenv("FCFF_SUMMARY_MAX_CHARS", "2000"))
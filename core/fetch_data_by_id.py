@@ -1,14 +1,6 @@
 #fetch_data_by_id.py
 
-from pymongo import MongoClient
-from core.config import MONGODB_URI
-
-client = MongoClient(MONGODB_URI)
-db = client["valoov_ai_db"]
-collection = db["user_qa"]
+from db.crud import get_report_inputs
 
 def fetch_data_by_id(document_id):
-    data = collection.find_one({"_id": document_id})
-    if not data:
-        return None, None
-    return data.get("eval_text"), data.get("pdf_text")
\ No newline at end of file
+    return get_report_inputs(document_id)
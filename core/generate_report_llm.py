@@ -1,16 +1,12 @@
 # generate_report_llm.py
-import os
-from dotenv import load_dotenv
-from google import genai
+from core.llm_gateway import generate_content, stream_content
+from core.prompt_builder import fit_context
 
 
-load_dotenv()
-
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-def generate_report(eval_text: str, pdf_text: str) -> str:
-    client = genai.Client(api_key=GEMINI_API_KEY)
-    prompt = (f"""
+def build_report_prompt(eval_text: str, pdf_text: str) -> str:
+    # The evaluation summary is kept whole; the PDF content is trimmed to the prompt budget
+    pdf_text = fit_context(document_text=pdf_text, fixed_text=eval_text, call_site="report")["document"]
+    return (f"""
     Based on the following two pieces of information, generate a comprehensive report:
 
     1. Evaluation Summary (LLM generated):
@@ -21,8 +17,13 @@ def generate_report(eval_text: str, pdf_text: str) -> str:
 
     The report should be structured, formal, and highlight key findings, strengths, weaknesses, and recommendations.
     """)
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=prompt
-    )
-    return response.text
\ No newline at end of file
+
+
+async def generate_report(eval_text: str, pdf_text: str) -> str:
+    return await generate_content(build_report_prompt(eval_text, pdf_text), call_site="report")
+
+
+async def generate_report_stream(eval_text: str, pdf_text: str):
+    """Same report as generate_report, yielded as text chunks while Gemini generates it."""
+    async for chunk in stream_content(build_report_prompt(eval_text, pdf_text), call_site="report"):
+        yield chunk
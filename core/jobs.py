@@ -0,0 +1,263 @@
+# jobs.py
+"""
+Background jobs for the long-running endpoints (valuation, report, personas).
+
+Handlers submit a coroutine factory and return 202 with the job id right away.
+A fixed number of worker tasks drain a bounded queue, so at most JOB_WORKERS
+jobs run at once; status and results are kept in a job store (Mongo ``jobs``
+collection, or in-process memory for tests and local runs) and polled through
+/api/v1/jobs/{job_id}.
+
+Every unfinished job records the process that owns it and a lease the owner
+renews on each heartbeat. A job whose lease has run out belongs to a process
+that stopped, so it is marked failed; jobs of other live processes are left
+alone.
+"""
+import asyncio
+import contextvars
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from core.config import (
+    JOB_BACKEND,
+    JOB_HEARTBEAT_SECONDS,
+    JOB_LEASE_SECONDS,
+    JOB_QUEUE_MAX_SIZE,
+    JOB_WORKERS,
+    MONGO_ASYNC_DRIVER,
+)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+UNFINISHED_STATES = (QUEUED, RUNNING)
+LEASE_EXPIRED_ERROR = "Interrupted: the server running this job stopped"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class InMemoryJobStore:
+    """Job store for tests and single-process local runs."""
+
+    def __init__(self):
+        self._jobs = {}
+
+    async def create(self, job: dict):
+        self._jobs[job["_id"]] = dict(job)
+
+    async def update(self, job_id: str, fields: dict, only_if_status: tuple = None) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or (only_if_status and job["status"] not in only_if_status):
+            return False
+        job.update(fields)
+        return True
+
+    async def get(self, job_id: str):
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def renew_leases(self, owner: str, lease_until: datetime):
+        for job in self._jobs.values():
+            if job.get("owner") == owner and job["status"] in UNFINISHED_STATES:
+                job["lease_until"] = lease_until
+
+    async def fail_expired(self, now: datetime):
+        for job in self._jobs.values():
+            if job["status"] in UNFINISHED_STATES and job.get("lease_until", now) < now:
+                job.update({"status": FAILED, "error": LEASE_EXPIRED_ERROR, "finished_at": now})
+
+
+class MongoJobStore:
+    """
+    Job store in the ``jobs`` collection, visible to every worker process.
+
+    Uses the shared AsyncMongoClient when MONGO_ASYNC_DRIVER is set, otherwise
+    the pooled sync client from a worker thread.
+    """
+
+    def __init__(self, collection=None, use_async: bool = MONGO_ASYNC_DRIVER):
+        if collection is None:
+            from db.mongodb import db, get_async_db
+            collection = get_async_db().jobs if use_async else db.jobs
+        self.collection = collection
+        self.use_async = use_async
+
+    async def _call(self, method, *args):
+        if self.use_async:
+            return await method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    async def create(self, job: dict):
+        await self._call(self.collection.insert_one, dict(job))
+
+    async def update(self, job_id: str, fields: dict, only_if_status: tuple = None) -> bool:
+        query = {"_id": job_id}
+        if only_if_status:
+            query["status"] = {"$in": list(only_if_status)}
+        result = await self._call(self.collection.update_one, query, {"$set": fields})
+        return result.matched_count > 0
+
+    async def get(self, job_id: str):
+        return await self._call(self.collection.find_one, {"_id": job_id})
+
+    async def renew_leases(self, owner: str, lease_until: datetime):
+        await self._call(
+            self.collection.update_many,
+            {"owner": owner, "status": {"$in": list(UNFINISHED_STATES)}},
+            {"$set": {"lease_until": lease_until}}
+        )
+
+    async def fail_expired(self, now: datetime):
+        # Only jobs whose owner stopped renewing (or written before leases existed) will never finish
+        await self._call(
+            self.collection.update_many,
+            {"status": {"$in": list(UNFINISHED_STATES)},
+             "$or": [{"lease_until": {"$lt": now}}, {"lease_until": {"$exists": False}}]},
+            {"$set": {"status": FAILED, "error": LEASE_EXPIRED_ERROR, "finished_at": now}}
+        )
+
+
+def get_job_store(backend: str = JOB_BACKEND):
+    if backend == "memory":
+        return InMemoryJobStore()
+    if backend == "mongo":
+        return MongoJobStore()
+    raise ValueError(f"Unknown job backend: {backend}")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Bounded worker pool over an asyncio queue.
+
+    Args:
+        store: InMemoryJobStore or MongoJobStore
+        workers (int): Number of jobs allowed to run concurrently
+        max_size (int): Maximum number of queued (not yet running) jobs
+        lease_seconds (int): How long a job stays owned by this process without a heartbeat
+        heartbeat_seconds (int): Interval between lease renewals and expired-job checks
+    """
+
+    def __init__(self, store, workers: int = JOB_WORKERS, max_size: int = JOB_QUEUE_MAX_SIZE,
+                 lease_seconds: int = JOB_LEASE_SECONDS, heartbeat_seconds: int = JOB_HEARTBEAT_SECONDS):
+        self.store = store
+        self.workers = workers
+        self.owner = uuid.uuid4().hex
+        self.lease = timedelta(seconds=lease_seconds)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_size = max_size
+        self._queue = asyncio.Queue(maxsize=max_size)
+        # Slots claimed by submits still writing their job record
+        self._reserved = 0
+        self._worker_tasks = []
+        self._heartbeat_task = None
+        self._running = {}
+
+    async def start(self):
+        await self.store.fail_expired(_now())
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self):
+        tasks = list(self._running.values()) + self._worker_tasks
+        if self._heartbeat_task is not None:
+            tasks.append(self._heartbeat_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._heartbeat_task = None
+        self._running = {}
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await self.store.renew_leases(self.owner, _now() + self.lease)
+                await self.store.fail_expired(_now())
+            except Exception as e:
+                # A missed beat is harmless as long as the next one lands within the lease
+                print(f"Job heartbeat failed: {type(e).__name__}: {e}")
+
+    async def submit(self, kind: str, factory, params: dict = None) -> str:
+        """
+        Queue factory() to run on the pool and return the job id.
+
+        Raises:
+            QueueFull: If JOB_QUEUE_MAX_SIZE jobs are already waiting
+        """
+        # The slot is claimed before awaiting the store, so concurrent submits cannot overfill the queue
+        if self._queue.qsize() + self._reserved >= self.max_size > 0:
+            raise QueueFull("Too many queued jobs, try again later")
+        self._reserved += 1
+        try:
+            job_id = uuid.uuid4().hex
+            await self.store.create({
+                "_id": job_id,
+                "kind": kind,
+                "status": QUEUED,
+                "params": params or {},
+                "owner": self.owner,
+                "lease_until": _now() + self.lease,
+                "created_at": _now(),
+            })
+        finally:
+            self._reserved -= 1
+        # Run the job in the submitting request's context (keeps the metrics endpoint label)
+        self._queue.put_nowait((job_id, factory, contextvars.copy_context()))
+        return job_id
+
+    async def get(self, job_id: str):
+        return await self.store.get(job_id)
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job. Returns False if it already finished or does not exist."""
+        cancelled = await self.store.update(
+            job_id, {"status": CANCELLED, "finished_at": _now()}, only_if_status=(QUEUED, RUNNING))
+        task = self._running.get(job_id)
+        if cancelled and task is not None:
+            task.cancel()
+        return cancelled
+
+    async def _worker(self):
+        while True:
+            job_id, factory, context = await self._queue.get()
+            try:
+                await self._run(job_id, factory, context)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str, factory, context):
+        started = await self.store.update(job_id, {"status": RUNNING, "started_at": _now()}, only_if_status=(QUEUED,))
+        if not started:
+            return  # cancelled while queued
+        task = asyncio.create_task(factory(), context=context)
+        self._running[job_id] = task
+        try:
+            # wait() does not propagate a worker shutdown into the job, stop() cancels both explicitly
+            await asyncio.wait({task})
+        finally:
+            self._running.pop(job_id, None)
+
+        if task.cancelled():
+            await self.store.update(job_id, {"status": CANCELLED, "finished_at": _now()}, only_if_status=(RUNNING, CANCELLED))
+        elif task.exception() is not None:
+            await self.store.update(job_id, {
+                "status": FAILED,
+                "error": f"{type(task.exception()).__name__}: {task.exception()}",
+                "finished_at": _now()
+            }, only_if_status=(RUNNING,))
+        else:
+            await self.store.update(job_id, {
+                "status": SUCCEEDED,
+                "result": task.result(),
+                "finished_at": _now()
+            }, only_if_status=(RUNNING,))
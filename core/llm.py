@@ -1,23 +1,10 @@
 # Placeholder for Gemini LLM integration
-import os
-from dotenv import load_dotenv
-load_dotenv()
-from google import genai
+from core.llm_gateway import generate_content
+from core.prompt_builder import fit_context
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "your-gemini-api-key")
-
-def generate_questions_from_text(text: str, num_questions: int = 47) -> list:
-    client = genai.Client(api_key=GEMINI_API_KEY)
-    prompt = (
-        f"Read the following document and generate {num_questions} important questions that a human should be able to answer after reading it. "
-        f"Return only the questions as a numbered list.\n\nDocument:\n{text}"
-    )
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=prompt
-    )
-    # Extract questions from response.text (assuming numbered list)
-    questions = [
+# Fixed questionnaire asked for every company; the LLM only adds document-specific
+# questions when more than these are requested.
+BASE_QUESTIONS = [
     # 1. Team & Founders
     "What is the total number of founders?",
     "How many founders work full-time on the project?",
@@ -81,17 +68,57 @@ def generate_questions_from_text(text: str, num_questions: int = 47) -> list:
     "Do you have any deferred tax assets? If so, what is their value?", # NEW
     "What illiquidity discount rate are you applying to your valuation? (This accounts for the difficulty of quickly converting private equity to cash, e.g., 15%, 20%)", # NEW
     "Please provide your estimated survival rates for each of the following years. This helps us account for the risk of early-stage startups not surviving. Year 1: ____% Year 2: ____% Year 3: ____% Year 4: ____% Year 5: ____% Year 6: ____% Year 7: ____% Year 8: ____% Year 9: ____% Year 10: ____%", # NEW (combined into one string for list item)
-    ]
-    if hasattr(response, "text"):
-        for line in response.text.split("\n"):
-            line = line.strip()
-            if line and (line[0].isdigit() or line.startswith("-") or line.startswith("•")):
-                # Remove number/bullet
-                q = line.lstrip("0123456789.-• ")
-                if q:
-                    questions.append(q)
+]
+
+def parse_questions(response_text: str) -> list:
+    """Questions from a numbered or bulleted LLM response."""
+    questions = []
+    for line in (response_text or "").split("\n"):
+        line = line.strip()
+        if line and (line[0].isdigit() or line.startswith("-") or line.startswith("•")):
+            # Remove number/bullet
+            q = line.lstrip("0123456789.-• ")
+            if q:
+                questions.append(q)
     # Fallback: if nothing parsed, return the whole response as one question
-    if not questions and hasattr(response, "text"):
-        questions = [response.text.strip()]
+    if not questions and response_text and response_text.strip():
+        questions = [response_text.strip()]
+    return questions
+
+def base_questions(num_questions: int = 47) -> list:
+    return BASE_QUESTIONS[:max(num_questions, 0)]
+
+def missing_question_count(num_questions: int = 47) -> int:
+    """How many questions the LLM has to add on top of the fixed list (0 = no LLM call)."""
+    return max(num_questions - len(BASE_QUESTIONS), 0)
+
+async def generate_document_questions(text: str, count: int) -> list:
+    """
+    Ask Gemini for `count` questions specific to the document.
+
+    Args:
+        text (str): Extracted PDF text
+        count (int): Number of questions wanted
+
+    Returns:
+        list: Up to `count` parsed questions (empty if count <= 0)
+    """
+    if count <= 0:
+        return []
+    document = fit_context(document_text=text, call_site="questions")["document"]
+    prompt = (
+        f"Read the following document and generate {count} important questions that a human should be able to answer after reading it. "
+        f"Return only the questions as a numbered list.\n\nDocument:\n{document}"
+    )
+    response_text = await generate_content(prompt, call_site="questions")
+    return parse_questions(response_text)[:count]
+
+async def generate_questions_from_text(text: str, num_questions: int = 47) -> list:
+    """
+    The fixed questionnaire, completed with document-specific LLM questions only
+    when num_questions exceeds it.
+    """
+    questions = base_questions(num_questions)
+    questions += await generate_document_questions(text, missing_question_count(num_questions))
     print(questions)
-    return questions[:num_questions] 
\ No newline at end of file
+    return questions
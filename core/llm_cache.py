@@ -0,0 +1,119 @@
+# llm_cache.py
+"""
+Two-tier cache for LLM responses.
+
+Keys hash the model, the normalized messages/prompt, tools, temperature and
+any other request arguments. Lookups hit an in-process LRU first, then the
+``llm_cache`` Mongo collection, whose TTL index (declared in db/indexes.py)
+expires entries after LLM_CACHE_TTL_SECONDS and which is shared by every worker.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from core.config import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS
+from db.mongodb import db
+
+_lru = OrderedDict()
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if hasattr(value, "model_dump"):
+        return _normalize(value.model_dump(exclude_none=True))
+    return value
+
+
+def make_cache_key(kind: str, model: str, payload, temperature=None, **kwargs) -> str:
+    """
+    Hash of everything that determines the response.
+
+    Args:
+        kind (str): "generate" or "chat"
+        model (str): Model name
+        payload: The prompt string or the chat messages
+        temperature (float, optional): Sampling temperature
+        **kwargs: Other request arguments (tools, tool_choice, response_format...)
+    """
+    body = {
+        "kind": kind,
+        "model": model,
+        "payload": _normalize(payload),
+        "temperature": temperature,
+        "kwargs": _normalize(kwargs),
+    }
+    encoded = json.dumps(body, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _lru_get(key: str):
+    entry = _lru.get(key)
+    if entry is None:
+        return None
+    value, expires_at = entry
+    if expires_at < time.monotonic():
+        _lru.pop(key, None)
+        return None
+    _lru.move_to_end(key)
+    return value
+
+
+def _lru_set(key: str, value):
+    _lru[key] = (value, time.monotonic() + LLM_CACHE_TTL_SECONDS)
+    _lru.move_to_end(key)
+    while len(_lru) > LLM_CACHE_MAX_ENTRIES:
+        _lru.popitem(last=False)
+
+
+def _mongo_get(key: str):
+    doc = db.llm_cache.find_one({"_id": key}, {"value": 1, "created_at": 1})
+    if not doc:
+        return None
+    # The TTL monitor runs about once a minute; don't serve entries it hasn't reaped yet
+    created_at = doc.get("created_at")
+    if created_at is not None:
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        if created_at < datetime.now(timezone.utc) - timedelta(seconds=LLM_CACHE_TTL_SECONDS):
+            return None
+    return doc["value"]
+
+
+def _mongo_set(key: str, value):
+    db.llm_cache.update_one(
+        {"_id": key},
+        {"$set": {"value": value, "created_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+
+async def lookup(key: str):
+    """Cached value for key, or None. Mongo errors are treated as a miss."""
+    value = _lru_get(key)
+    if value is not None:
+        return value
+    try:
+        value = await asyncio.to_thread(_mongo_get, key)
+    except Exception as e:
+        print(f"LLM cache read failed: {str(e)}")
+        return None
+    if value is not None:
+        _lru_set(key, value)
+    return value
+
+
+async def store(key: str, value):
+    """Store a JSON-serializable value in both tiers. Mongo errors are logged and ignored."""
+    _lru_set(key, value)
+    try:
+        await asyncio.to_thread(_mongo_set, key, value)
+    except Exception as e:
+        print(f"LLM cache write failed: {str(e)}")
@@ -0,0 +1,280 @@
+# llm_gateway.py
+"""
+Shared async gateway for every Gemini call in the backend.
+
+The FastAPI handlers are ``async def``, so LLM calls must not block the event
+loop. This module owns one long-lived client per protocol (the native
+``genai`` API and Gemini's OpenAI-compatible endpoint), each backed by a
+pooled HTTP connection, and exposes small coroutine helpers used by
+``core/llm.py``, ``core/generate_report_llm.py``, ``core/FCFFprojection.py``
+and ``core/startup_valuation.py``.
+
+Every call is timed and retried here, and reported to ``core.metrics`` under
+a ``call_site`` label (plus ``persona`` for report personas). Responses are
+served from ``core.llm_cache`` when an identical request was seen before,
+unless the caller passes ``use_cache=False``.
+"""
+import asyncio
+import random
+import time
+
+import httpx
+import openai
+from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+
+from openai.types.chat import ChatCompletion
+
+from core import llm_cache, metrics
+from core.config import (
+    GEMINI_API_BASE_URL,
+    GEMINI_API_KEY,
+    GEMINI_OPENAI_BASE_URL,
+    LLM_CACHE_ENABLED,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_MAX_RETRIES,
+    LLM_MODEL,
+    LLM_TIMEOUT_SECONDS,
+)
+
+_genai_client = None
+_openai_client = None
+
+
+def get_genai_client() -> genai.Client:
+    """
+    Return the process-wide ``genai`` client, creating it on first use.
+    """
+    global _genai_client
+    if _genai_client is None:
+        http_options = genai_types.HttpOptions(base_url=GEMINI_API_BASE_URL) if GEMINI_API_BASE_URL else None
+        _genai_client = genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+    return _genai_client
+
+
+def get_openai_client() -> openai.AsyncOpenAI:
+    """
+    Return the process-wide async OpenAI-compatible client for Gemini.
+
+    The client keeps a bounded pool of keep-alive connections so concurrent
+    requests reuse TCP/TLS sessions instead of opening one per call.
+    """
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = openai.AsyncOpenAI(
+            api_key=GEMINI_API_KEY,
+            base_url=GEMINI_OPENAI_BASE_URL,
+            timeout=LLM_TIMEOUT_SECONDS,
+            # Retries are done by _call_with_retries so they can be counted
+            max_retries=0,
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                timeout=LLM_TIMEOUT_SECONDS,
+            ),
+        )
+    return _openai_client
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    if isinstance(error, genai_errors.APIError):
+        return error.code == 429 or (error.code or 0) >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+async def _call_with_retries(make_call, labels: dict, observe_latency: bool = True):
+    """
+    Await make_call() with exponential backoff on transient errors, recording
+    latency, retries and failures for the given metric labels.
+
+    Streaming callers pass observe_latency=False and record the full stream
+    duration themselves.
+    """
+    started = time.perf_counter()
+    attempt = 0
+    try:
+        while True:
+            try:
+                return await make_call()
+            except Exception as e:
+                if attempt >= LLM_MAX_RETRIES or not _is_retryable(e):
+                    metrics.LLM_ERRORS.inc(error=type(e).__name__, **labels)
+                    raise
+                attempt += 1
+                metrics.LLM_RETRIES.inc(**labels)
+                await asyncio.sleep(min(2 ** attempt, 20) * (0.5 + random.random() / 2))
+    finally:
+        if observe_latency:
+            metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+
+
+def _labels(call_site: str, persona: str, model: str) -> dict:
+    return {
+        "call_site": call_site,
+        "endpoint": metrics.current_endpoint.get(),
+        "persona": persona or "",
+        "model": model,
+    }
+
+
+async def _cached(cache_key, labels: dict):
+    if cache_key is None:
+        return None
+    value = await llm_cache.lookup(cache_key)
+    if value is None:
+        metrics.LLM_CACHE_MISSES.inc(**labels)
+    else:
+        metrics.LLM_CACHE_HITS.inc(**labels)
+    return value
+
+
+async def generate_content(prompt: str, model: str = LLM_MODEL, call_site: str = "unknown", persona: str = "",
+                           use_cache: bool = True) -> str:
+    """
+    Run a single-prompt generation through the native ``genai`` async API.
+
+    Args:
+        prompt (str): The full prompt text
+        model (str): Gemini model name
+        call_site (str): Metrics label naming the caller
+        persona (str): Metrics label for report personas
+        use_cache (bool): Serve/store the response through the LLM cache
+
+    Returns:
+        str: The generated text (empty string if the model returned none)
+    """
+    labels = _labels(call_site, persona, model)
+    cache_key = llm_cache.make_cache_key("generate", model, prompt) if use_cache and LLM_CACHE_ENABLED else None
+    cached = await _cached(cache_key, labels)
+    if cached is not None:
+        return cached
+
+    client = get_genai_client()
+    response = await _call_with_retries(
+        lambda: client.aio.models.generate_content(model=model, contents=prompt), labels)
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        metrics.LLM_PROMPT_TOKENS.observe(usage.prompt_token_count or 0, **labels)
+        metrics.LLM_COMPLETION_TOKENS.observe(usage.candidates_token_count or 0, **labels)
+    text = getattr(response, "text", None) or ""
+    if cache_key is not None and text:
+        await llm_cache.store(cache_key, text)
+    return text
+
+
+async def stream_content(prompt: str, model: str = LLM_MODEL, call_site: str = "unknown", persona: str = "",
+                         use_cache: bool = True):
+    """
+    Stream a single-prompt generation through the native ``genai`` streaming API.
+
+    Retries only cover opening the stream (up to the first chunk); once text
+    has been yielded a failure is raised to the caller. A cached response is
+    yielded as one chunk, and a fully streamed response is stored in the cache.
+
+    Args:
+        prompt (str): The full prompt text
+        model (str): Gemini model name
+        call_site (str): Metrics label naming the caller
+        persona (str): Metrics label for report personas
+        use_cache (bool): Serve/store the response through the LLM cache
+
+    Yields:
+        str: Text chunks in generation order
+    """
+    labels = _labels(call_site, persona, model)
+    cache_key = llm_cache.make_cache_key("generate", model, prompt) if use_cache and LLM_CACHE_ENABLED else None
+    cached = await _cached(cache_key, labels)
+    if cached is not None:
+        yield cached
+        return
+
+    client = get_genai_client()
+
+    async def open_stream():
+        stream = await client.aio.models.generate_content_stream(model=model, contents=prompt)
+        return stream, await anext(stream, None)
+
+    started = time.perf_counter()
+    parts = []
+    usage = None
+    try:
+        stream, chunk = await _call_with_retries(open_stream, labels, observe_latency=False)
+        while chunk is not None:
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            text = getattr(chunk, "text", None)
+            if text:
+                parts.append(text)
+                yield text
+            try:
+                chunk = await anext(stream, None)
+            except Exception as e:
+                metrics.LLM_ERRORS.inc(error=type(e).__name__, **labels)
+                raise
+    finally:
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+
+    if usage:
+        metrics.LLM_PROMPT_TOKENS.observe(usage.prompt_token_count or 0, **labels)
+        metrics.LLM_COMPLETION_TOKENS.observe(usage.candidates_token_count or 0, **labels)
+    if cache_key is not None and parts:
+        await llm_cache.store(cache_key, "".join(parts))
+
+
+async def chat_completion(messages: list, model: str = LLM_MODEL, temperature: float = 0.1,
+                          call_site: str = "unknown", persona: str = "", use_cache: bool = True, **kwargs):
+    """
+    Run a chat completion through Gemini's OpenAI-compatible endpoint.
+
+    Args:
+        messages (list): OpenAI-style chat messages
+        model (str): Gemini model name
+        temperature (float): Sampling temperature
+        call_site (str): Metrics label naming the caller
+        persona (str): Metrics label for report personas
+        use_cache (bool): Serve/store the response through the LLM cache
+        **kwargs: Extra ``chat.completions.create`` arguments (``tools``, ``tool_choice``...)
+
+    Returns:
+        ChatCompletion: The raw completion object
+    """
+    labels = _labels(call_site, persona, model)
+    cache_key = llm_cache.make_cache_key("chat", model, messages, temperature, **kwargs) \
+        if use_cache and LLM_CACHE_ENABLED else None
+    cached = await _cached(cache_key, labels)
+    if cached is not None:
+        return ChatCompletion.model_validate(cached)
+
+    client = get_openai_client()
+    response = await _call_with_retries(
+        lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            **kwargs,
+        ),
+        labels,
+    )
+    usage = getattr(response, "usage", None)
+    if usage:
+        metrics.LLM_PROMPT_TOKENS.observe(usage.prompt_tokens or 0, **labels)
+        metrics.LLM_COMPLETION_TOKENS.observe(usage.completion_tokens or 0, **labels)
+    if cache_key is not None:
+        await llm_cache.store(cache_key, response.model_dump(mode="json"))
+    return response
+
+
+async def close_clients():
+    """
+    Close pooled connections. Called from the FastAPI lifespan on shutdown.
+    """
+    global _genai_client, _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+    _genai_client = None
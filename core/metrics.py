@@ -0,0 +1,107 @@
+# metrics.py
+"""
+Minimal in-process Prometheus metrics for LLM calls.
+
+Only histograms and counters are needed here, so the registry is kept in this
+module rather than pulling in a client library. `render()` produces the
+Prometheus text exposition format served on /metrics.
+"""
+import contextvars
+import threading
+from bisect import bisect_left
+
+# Route template of the HTTP request being served (e.g. "/api/v1/valuation"),
+# set by a dependency in main.py and inherited by tasks spawned for it.
+current_endpoint = contextvars.ContextVar("current_endpoint", default="none")
+
+LLM_LABELS = ("call_site", "endpoint", "persona", "model")
+
+_lock = threading.Lock()
+_registry = []
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = list(zip(names, values)) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    escaped = ['{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with _lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': f'{bound:g}'})} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': '+Inf'})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    with _lock:
+        lines = [line for metric in _registry for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60, 120)
+TOKEN_BUCKETS = (100, 500, 1_000, 2_000, 5_000, 10_000, 20_000, 50_000, 100_000, 200_000, 500_000, 1_000_000)
+
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "Latency of LLM calls, including retries.", LLM_LABELS, LATENCY_BUCKETS)
+LLM_PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens", "Prompt tokens per LLM call.", LLM_LABELS, TOKEN_BUCKETS)
+LLM_COMPLETION_TOKENS = Histogram(
+    "llm_completion_tokens", "Completion tokens per LLM call.", LLM_LABELS, TOKEN_BUCKETS)
+LLM_RETRIES = Counter(
+    "llm_retries_total", "LLM call attempts retried after a transient error.", LLM_LABELS)
+LLM_ERRORS = Counter(
+    "llm_errors_total", "LLM calls that failed after all retries.", LLM_LABELS + ("error",))
+LLM_CACHE_HITS = Counter(
+    "llm_cache_hits_total", "LLM calls served from the response cache.", LLM_LABELS)
+LLM_CACHE_MISSES = Counter(
+    "llm_cache_misses_total", "Cacheable LLM calls that went to the model.", LLM_LABELS)
+AGENT_TURNS = Histogram(
+    "agent_turns", "Completions per valuation agent run.", ("endpoint", "model"), (1, 2, 3, 5, 8, 10, 13, 16, 20, 21))
+PROMPT_TRUNCATED_TOKENS = Counter(
+    "prompt_truncated_tokens_total", "Estimated context tokens dropped to fit the prompt budget.", ("call_site",))
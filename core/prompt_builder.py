@@ -0,0 +1,118 @@
+# prompt_builder.py
+"""
+Token-budgeted prompt context shared by every LLM call site.
+
+Prompts used to paste the whole extracted PDF in. `fit_context` instead fills
+a per-call token budget by priority: the fixed parts of the prompt (template,
+evaluation summary, forecast) are always kept, then the Q&A answers, then the
+document sections that look financial, then the remaining sections. Kept
+sections stay in document order and omitted ones are marked, and the
+truncation is printed and counted in `prompt_truncated_tokens_total`.
+"""
+import math
+import re
+
+from core.config import PROMPT_TOKEN_BUDGET
+from core.metrics import PROMPT_TRUNCATED_TOKENS
+
+CHARS_PER_TOKEN = 4
+# Instructions around the context and the model's response
+PROMPT_OVERHEAD_TOKENS = 1_000
+MAX_SECTION_CHARS = 4_000
+OMITTED_MARKER = "[...]"
+
+FINANCIAL_PATTERN = re.compile(
+    r"revenue|sales|ebitda|ebit\b|income|profit|loss|margin|cash|balance sheet|assets|liabilit|equity|"
+    r"debt|capex|capital|expense|cost|forecast|projection|valuation|funding|investment|dividend|tax|"
+    r"[$€£]\s?\d|\d\s?%",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for Gemini on English text)."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def split_sections(text: str, max_chars: int = MAX_SECTION_CHARS) -> list:
+    """Split a document on blank lines, breaking long paragraphs on line boundaries."""
+    sections = []
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        paragraph = paragraph.strip()
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind("\n", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            sections.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip()
+        if paragraph:
+            sections.append(paragraph)
+    return sections
+
+
+def is_financial(section: str, min_hits: int = 3) -> bool:
+    return len(FINANCIAL_PATTERN.findall(section)) >= min_hits
+
+
+def _truncate(text: str, tokens: int) -> str:
+    if estimate_tokens(text) <= tokens:
+        return text
+    return text[:max(tokens, 0) * CHARS_PER_TOKEN].rstrip() + f"\n{OMITTED_MARKER}"
+
+
+def fit_context(document_text: str = "", qa_text: str = "", fixed_text: str = "",
+                budget_tokens: int = PROMPT_TOKEN_BUDGET, call_site: str = "unknown") -> dict:
+    """
+    Fit the variable parts of a prompt into a token budget.
+
+    Args:
+        document_text (str): Extracted PDF text, filled last and by section priority
+        qa_text (str): Formatted Q&A answers, filled first
+        fixed_text (str): Everything else placed in the prompt verbatim; only counted
+        budget_tokens (int): Token budget for the whole prompt
+        call_site (str): Label for the truncation report and metric
+
+    Returns:
+        dict: {"document": str, "qa": str, "report": {budget_tokens, used_tokens,
+            document_tokens, kept_document_tokens, truncated_tokens}}
+    """
+    available = budget_tokens - PROMPT_OVERHEAD_TOKENS - estimate_tokens(fixed_text)
+    qa_tokens = estimate_tokens(qa_text)
+    qa = _truncate(qa_text, available)
+    available -= estimate_tokens(qa)
+
+    document_tokens = estimate_tokens(document_text)
+    if document_tokens <= available:
+        # Common case: the whole document fits and is passed through unchanged
+        document, kept_document_tokens = document_text, document_tokens
+    else:
+        sections = split_sections(document_text)
+        section_tokens = [estimate_tokens(section) for section in sections]
+        keep = [False] * len(sections)
+        financial_first = sorted(range(len(sections)), key=lambda i: (not is_financial(sections[i]), i))
+        for index in financial_first:
+            if section_tokens[index] <= available:
+                keep[index] = True
+                available -= section_tokens[index]
+
+        parts = []
+        for index, section in enumerate(sections):
+            if keep[index]:
+                parts.append(section)
+            elif not parts or parts[-1] != OMITTED_MARKER:
+                parts.append(OMITTED_MARKER)
+        document = "\n\n".join(parts)
+        kept_document_tokens = sum(tokens for tokens, kept in zip(section_tokens, keep) if kept)
+
+    truncated = max(document_tokens - kept_document_tokens, 0) + max(qa_tokens - estimate_tokens(qa), 0)
+    report = {
+        "budget_tokens": budget_tokens,
+        "used_tokens": PROMPT_OVERHEAD_TOKENS + estimate_tokens(fixed_text) + estimate_tokens(qa) + kept_document_tokens,
+        "document_tokens": document_tokens,
+        "kept_document_tokens": kept_document_tokens,
+        "truncated_tokens": truncated,
+    }
+    if truncated:
+        PROMPT_TRUNCATED_TOKENS.inc(truncated, call_site=call_site)
+        print(f"Prompt budget ({call_site}): kept {kept_document_tokens}/{document_tokens} document tokens, "
+              f"{truncated} tokens truncated to fit {budget_tokens}")
+    return {"document": document, "qa": qa, "report": report}
@@ -1,19 +1,14 @@
-from report_agent.personas import personas
-import os
-from pymongo import MongoClient
+from core.report_agent.personas import personas
+from core.report_agent.context import build_persona_contexts
+from core.llm_gateway import generate_content
+from core.config import LLM_MODEL, PERSONA_MAX_CONCURRENCY, PERSONA_TIMEOUT_SECONDS
+from core.metrics import LLM_ERRORS, current_endpoint
+from db.crud import get_user_context, push_report_result
+import asyncio
 import json
 import re
 
-def get_user_context(user_id):
-    client = MongoClient(os.getenv("MONGODB_URI"))
-    db = client["valoov_ai_db"]
-    pdf_texts = list(db["pdf_texts"].find({"user_id": user_id}))
-    user_qas = list(db["user_qas"].find({"user_id": user_id}))
-    return pdf_texts, user_qas
-
 def save_report_data(user_id, result):
-    client = MongoClient(os.getenv("MONGODB_URI"))
-    db = client["valoov_ai_db"]
     # If result is a string, clean and parse it to dict
     if isinstance(result, str):
         # Remove markdown code block if present
@@ -22,38 +17,79 @@ def save_report_data(user_id, result):
             result = json.loads(cleaned)
         except Exception:
             result = {"raw": cleaned}
-    db["report_data"].update_one(
-        {"user_id": user_id},
-        {"$push": {"results": result}},
-        upsert=True
-    )
+    push_report_result(user_id, result)
 
-def agent(prompt: str, api_key: str):
-    try:
-        from google import genai
-    except ImportError:
-        return {"error": "google-genai library not installed."}
-    if not api_key:
-        return {"error": "API key not provided."}
-    client = genai.Client(api_key=api_key)
-    response = client.models.generate_content(
-        model="gemini-2.0-flash", contents=prompt
-    )
-    return getattr(response, 'text', str(response))
-
-def process_personas(user_id, api_key):
-    pdf_texts, user_qas = get_user_context(user_id)
-    context = f"PDF Texts: {pdf_texts}\nUser QAs: {user_qas}"
-    results = []
-    for idx, persona in enumerate(personas):
-        prompt = f"{persona['description']}\n\nContext:\n{context}"
-        result = agent(prompt, api_key)
-        print(f"Persona: {persona['name']} | Role: {persona['role']}\nPrompt: {prompt}\nResponse: {result}\n{'-'*40}")
+async def agent(prompt: str, persona_name: str = ""):
+    return await generate_content(prompt, call_site="persona", persona=persona_name)
+
+async def run_persona(user_id, persona, context, semaphore, timeout=PERSONA_TIMEOUT_SECONDS):
+    """
+    Run one persona under the shared concurrency limit.
+
+    Failures and timeouts are returned as {"error": ...} so they never
+    cancel the other personas.
+    """
+    prompt = f"{persona['description']}\n\nContext:\n{context}"
+    async with semaphore:
+        try:
+            result = await asyncio.wait_for(agent(prompt, persona["name"]), timeout=timeout)
+        except asyncio.TimeoutError:
+            LLM_ERRORS.inc(call_site="persona", endpoint=current_endpoint.get(), persona=persona["name"],
+                           model=LLM_MODEL, error="TimeoutError")
+            result = {"error": f"Persona timed out after {timeout}s"}
+        except Exception as e:
+            result = {"error": f"Persona failed: {str(e)}"}
+    print(f"Persona: {persona['name']} | Role: {persona['role']}\nResponse: {result}\n{'-'*40}")
+    if not isinstance(result, dict):
         # Save only the response for each agent
-        save_report_data(user_id, result)
-        results.append({
-            "persona": persona["name"],
-            "role": persona["role"],
-            "response": result
-        })
-    return {"results": results} 
\ No newline at end of file
+        await asyncio.to_thread(save_report_data, user_id, result)
+    return {
+        "persona": persona["name"],
+        "role": persona["role"],
+        "response": result
+    }
+
+async def process_personas(user_id, max_concurrency=PERSONA_MAX_CONCURRENCY, timeout=PERSONA_TIMEOUT_SECONDS):
+    """
+    Run every persona concurrently against the user's context.
+
+    Args:
+        user_id: The user whose PDFs and Q&A form the context
+        max_concurrency (int): Maximum number of personas in flight at once
+        timeout (float): Per-persona timeout in seconds
+
+    Returns:
+        dict: {"results": [...]} in persona order
+    """
+    contexts = await _load_contexts(user_id)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = await asyncio.gather(*(
+        run_persona(user_id, persona, contexts[persona["name"]], semaphore, timeout)
+        for persona in personas
+    ))
+    return {"results": list(results)}
+
+async def iter_personas(user_id, max_concurrency=PERSONA_MAX_CONCURRENCY, timeout=PERSONA_TIMEOUT_SECONDS):
+    """
+    Same as process_personas, but yields each persona's result as soon as it finishes.
+
+    Pending personas are cancelled if the consumer stops early (e.g. the client disconnects).
+    """
+    contexts = await _load_contexts(user_id)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = [asyncio.create_task(run_persona(user_id, persona, contexts[persona["name"]], semaphore, timeout))
+             for persona in personas]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def _load_contexts(user_id):
+    pdf_texts, user_qas = await asyncio.to_thread(get_user_context, user_id)
+    return await asyncio.to_thread(_build_contexts, pdf_texts, user_qas)
+
+def _build_contexts(pdf_texts, user_qas):
+    # One Q&A digest for the report; each persona only adds its own retrieved passages
+    return build_persona_contexts(pdf_texts, user_qas, {persona["name"]: persona.get("query") for persona in personas})
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import re
+from core.config import PROMPT_TOKEN_BUDGET
+from core.prompt_builder import fit_context
+from core.retrieval import retrieve
+from db.crud import load_pdf_text, get_report_context, save_report_context
+
+def _clean_text(text):
+    # Collapse runs of whitespace left over from PDF extraction
+    return re.sub(r"\s+", " ", text or "").strip()
+
+def _answered_qas(user_qas):
+    pairs = []
+    for doc in user_qas:
+        qas = (doc.get("user_qa") or {}).get("qas") or doc.get("qas") or []
+        for qa in qas:
+            question = _clean_text(qa.get("question"))
+            answer = _clean_text(qa.get("answer"))
+            if question and answer:
+                pairs.append((question, answer))
+    return pairs
+
+def qa_hash(user_qas):
+    """Stable hash of the answered Q&A pairs (and the budget they were fitted to)."""
+    payload = json.dumps({"qas": _answered_qas(user_qas), "budget": PROMPT_TOKEN_BUDGET}, ensure_ascii=False)
+    return "qa:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def build_qa_digest(user_qas):
+    """
+    The answered Q&A section shared by every persona.
+
+    Only cleaned question/answer pairs are kept; Mongo ids, unanswered
+    questions and bookkeeping fields are dropped. The answers are fitted
+    to the prompt budget once, before any document text.
+    """
+    qa_lines = [f"Q: {question}\nA: {answer}" for question, answer in _answered_qas(user_qas)]
+    qa = fit_context(qa_text="\n".join(qa_lines), call_site="persona")["qa"]
+    return "Answered questions:\n" + qa if qa else ""
+
+def get_qa_digest(user_qas):
+    """
+    Return the Q&A digest for these answers, building and storing it on first use.
+
+    Digests live in the report_contexts collection keyed by qa_hash, so
+    repeated reports on unchanged answers skip the rebuild.
+    """
+    key = qa_hash(user_qas)
+    cached = get_report_context(key)
+    if cached is not None:
+        return cached
+    digest = build_qa_digest(user_qas)
+    save_report_context(key, digest)
+    return digest
+
+def _document_text(doc):
+    # Paragraph breaks are kept so the budget can drop whole sections
+    return "\n\n".join(_clean_text(paragraph) for paragraph in re.split(r"\n\s*\n", load_pdf_text(doc) or "") if paragraph.strip())
+
+def build_persona_contexts(pdf_texts, user_qas, queries):
+    """
+    Context for every persona: the shared Q&A digest plus, per persona, only
+    the top-k passages of each document for its retrieval query.
+
+    Documents that cannot be retrieved from (no content hash, or no matching
+    passage) and personas without a query get the whole document. Only the
+    document part is fitted per persona, into what the digest leaves of the
+    budget; personas that end up with the same documents share one fit.
+
+    Args:
+        pdf_texts (list): The user's pdf_texts documents
+        user_qas (list): The user's user_qas documents
+        queries (dict): Persona name -> retrieval query (None for the whole documents)
+
+    Returns:
+        dict: Persona name -> context text
+    """
+    qa_digest = get_qa_digest(user_qas)
+    whole, fitted, contexts = {}, {}, {}
+    for name, query in queries.items():
+        documents = []
+        for index, doc in enumerate(pdf_texts, start=1):
+            passages = retrieve(doc["pdf_hash"], query) if query and doc.get("pdf_hash") else None
+            if passages:
+                text = "\n\n".join(passages)
+            else:
+                if index not in whole:
+                    whole[index] = _document_text(doc)
+                text = whole[index]
+            if text:
+                documents.append(f"Document {index}:\n{text}")
+        document_text = "\n\n".join(documents)
+        if document_text not in fitted:
+            fitted[document_text] = fit_context(document_text=document_text, fixed_text=qa_digest, call_site="persona")["document"]
+        contexts[name] = "\n\n".join(section for section in (fitted[document_text], qa_digest) if section)
+    return contexts
@@ -0,0 +1,138 @@
+# retrieval.py
+"""
+Offline BM25 retrieval over a document's chunks.
+
+The extracted text is chunked once at upload (`index_pdf`) and the chunks are
+stored in the ``pdf_chunks`` collection under the PDF's content hash, like the
+text blob itself. `retrieve` scores the chunks against a query and returns the
+top-k passages in document order, so the report personas and the FCFF prompt
+only send the part of the deck they need. Scoring statistics are rebuilt from
+the stored chunks and kept in a small per-process LRU.
+"""
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from core.config import RETRIEVAL_CACHE_SIZE, RETRIEVAL_CHUNK_CHARS, RETRIEVAL_TOP_K
+from core.prompt_builder import split_sections
+from db.crud import get_pdf_blob_text, get_pdf_chunks, save_pdf_chunks
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "we our you your they their".split()
+)
+
+# Shared by the worker threads retrieval runs on; every access goes through _indexes_lock
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def tokenize(text: str) -> list:
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+def chunk_text(text: str, chunk_chars: int = RETRIEVAL_CHUNK_CHARS) -> list:
+    """Pack consecutive paragraphs into chunks of about chunk_chars characters."""
+    chunks, current = [], ""
+    for section in split_sections(text, max_chars=chunk_chars):
+        if current and len(current) + len(section) > chunk_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{section}" if current else section
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of chunks.
+
+    Args:
+        chunks (list): Passage texts
+        k1 (float): Term-frequency saturation
+        b (float): Length normalisation
+    """
+
+    def __init__(self, chunks: list, k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(chunk)) for chunk in chunks]
+        self.lengths = [sum(freqs.values()) for freqs in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        doc_freqs = Counter(term for freqs in self.term_freqs for term in freqs)
+        n = len(chunks)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+
+    def scores(self, query: str) -> list:
+        terms = [term for term in set(tokenize(query)) if term in self.idf]
+        scores = []
+        for freqs, length in zip(self.term_freqs, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            scores.append(sum(
+                self.idf[term] * freqs[term] * (self.k1 + 1) / (freqs[term] + norm)
+                for term in terms if term in freqs
+            ))
+        return scores
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> list:
+        """Indexes of the top-k chunks with a positive score, best first."""
+        scores = self.scores(query)
+        ranked = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i])
+        return ranked[:k]
+
+
+def index_pdf(pdf_hash: str, text: str) -> BM25Index:
+    """Chunk and store a document's text; called at upload."""
+    chunks = chunk_text(text)
+    save_pdf_chunks(pdf_hash, chunks)
+    return _remember(pdf_hash, BM25Index(chunks))
+
+
+def _remember(pdf_hash: str, index: BM25Index) -> BM25Index:
+    with _indexes_lock:
+        _indexes[pdf_hash] = index
+        _indexes.move_to_end(pdf_hash)
+        while len(_indexes) > RETRIEVAL_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def _cached_index(pdf_hash: str):
+    with _indexes_lock:
+        index = _indexes.get(pdf_hash)
+        if index is not None:
+            _indexes.move_to_end(pdf_hash)
+        return index
+
+
+def get_index(pdf_hash: str):
+    """BM25 index for a PDF hash, or None if the text is unknown. Documents uploaded before
+    indexing existed are chunked from their stored text on first use."""
+    index = _cached_index(pdf_hash)
+    if index is not None:
+        return index
+    # Loading and building run outside the lock; a concurrent build of the same PDF is harmless
+    chunks = get_pdf_chunks(pdf_hash)
+    if chunks is not None:
+        return _remember(pdf_hash, BM25Index(chunks))
+    text = get_pdf_blob_text(pdf_hash)
+    if text is None:
+        return None
+    return index_pdf(pdf_hash, text)
+
+
+def retrieve(pdf_hash: str, query: str, k: int = RETRIEVAL_TOP_K):
+    """
+    Top-k passages of a document for a query, in document order.
+
+    Returns:
+        list: Passages (empty if nothing matched), or None if the document is not indexed
+    """
+    index = get_index(pdf_hash)
+    if index is None:
+        return None
+    return [index.chunks[i] for i in sorted(index.search(query, k))]
@@ -0,0 +1,313 @@
+# valuation_methods.py
+"""
+Valuation calculators used by the startup valuation agent (as LLM tools) and
+by the deterministic valuation pipeline.
+"""
+
+def get_valuation_weights(business_stage: str) -> dict:
+    """
+    Returns a dictionary of valuation method weights based on the business stage.
+    Args:
+        business_stage (str): The stage of the business (e.g., "Idea", "Startup", "Expansion", "Development", "Growth", "Maturity").
+    """
+    print(f"Python function 'get_valuation_weights' called with stage: {business_stage}")
+    weights_table = {
+        "Idea": {"Scorecard": 0.38, "Checklist": 0.38, "VC Method": 0.16, "DCF w/ LTG": 0.04, "DCF w/ Multiple": 0.04},
+        "Startup": {"Scorecard": 0.30, "Checklist": 0.30, "VC Method": 0.16, "DCF w/ LTG": 0.12, "DCF w/ Multiple": 0.12},
+        "Development": {"Scorecard": 0.15, "Checklist": 0.15, "VC Method": 0.16, "DCF w/ LTG": 0.27, "DCF w/ Multiple": 0.27},
+        "Expansion": {"Scorecard": 0.06, "Checklist": 0.06, "VC Method": 0.16, "DCF w/ LTG": 0.36, "DCF w/ Multiple": 0.36},
+        "Growth": {"Scorecard": 0.0, "Checklist": 0.0, "VC Method": 0.16, "DCF w/ LTG": 0.40, "DCF w/ Multiple": 0.40},
+        "Maturity": {"Scorecard": 0.0, "Checklist": 0.0, "VC Method": 0.16, "DCF w/ LTG": 0.50, "DCF w/ Multiple": 0.50}
+    }
+
+    for stage_key in weights_table:
+        if "DCF w/ Multiples" in weights_table[stage_key]:
+            weights_table[stage_key]["DCF w/ Multiple"] = weights_table[stage_key].pop("DCF w/ Multiples")
+
+    normalized_stage = business_stage.capitalize()
+    if normalized_stage not in weights_table:
+        return {"error": f"Unknown business stage: {business_stage}. Valid stages are {list(weights_table.keys())}"}
+    return weights_table[normalized_stage]
+
+def calculate_final_weighted_valuation(individual_method_results: dict, weights: dict) -> dict:
+    """
+    Calculates the final weighted average valuation.
+    """
+    print(f"Python function 'calculate_final_weighted_valuation' called with results: {individual_method_results}, weights: {weights}")
+    final_valuation = 0
+    calculation_details = []
+    standardized_results = {k.replace('(','').replace(')',''): v for k,v in individual_method_results.items()}
+    standardized_weights = {k.replace('(','').replace(')',''): v for k,v in weights.items()}
+
+    for method_key_std, value in standardized_results.items():
+        original_method_name = method_key_std
+        for w_key_orig in weights.keys():
+            if w_key_orig.replace('(','').replace(')','') == method_key_std:
+                original_method_name = w_key_orig
+                break
+
+        weight = standardized_weights.get(method_key_std, 0)
+        if weight > 0:
+            weighted_value = value * weight
+            final_valuation += weighted_value
+            calculation_details.append(f"{original_method_name}: EUR {value:,.0f} * {weight*100:.0f}% = EUR {weighted_value:,.0f}")
+        else:
+            calculation_details.append(f"{original_method_name}: EUR {value:,.0f} (Weight is {weight*100:.0f}%, not included in total or N/A)")
+
+    return {
+        "final_weighted_valuation": round(final_valuation, 2),
+        "calculation_breakdown": calculation_details
+    }
+
+def calculate_scorecard_valuation(
+    average_pre_money_valuation: float,
+    strength_of_team_score: float,
+    size_of_opportunity_score: float,
+    product_service_ip_score: float,
+    competitive_environment_score: float,
+    strategic_relationships_score: float,
+    funding_requirement_score: float
+    ) -> dict:
+    """
+    Calculates valuation using the Scorecard method.
+    """
+    print(f"Python function 'calculate_scorecard_valuation' called.")
+
+    weights = {
+        "team": 0.30, "opportunity": 0.25, "product_ip": 0.15,
+        "competition": 0.10, "strategic_rel": 0.10, "funding_req": 0.10
+    }
+
+    score_multiplier = (
+        strength_of_team_score * weights["team"] +
+        size_of_opportunity_score * weights["opportunity"] +
+        product_service_ip_score * weights["product_ip"] +
+        competitive_environment_score * weights["competition"] +
+        strategic_relationships_score * weights["strategic_rel"] +
+        funding_requirement_score * weights["funding_req"]
+    )
+
+    valuation = average_pre_money_valuation * score_multiplier
+    return {
+        "method_name": "Scorecard",
+        "valuation": round(valuation, 2),
+        "details": {
+            "average_pre_money_valuation": average_pre_money_valuation,
+            "composite_score_multiplier": round(score_multiplier, 3),
+            "inputs_scores": {
+                "strength_of_team_score": strength_of_team_score,
+                "size_of_opportunity_score": size_of_opportunity_score,
+                "product_service_ip_score": product_service_ip_score,
+                "competitive_environment_score": competitive_environment_score,
+                "strategic_relationships_score": strategic_relationships_score,
+                "funding_requirement_score": funding_requirement_score
+            }
+        }
+    }
+
+def calculate_checklist_valuation(
+    max_valuation_assumption: float,
+    idea_quality_score: float,
+    product_ip_score: float,
+    core_team_score: float,
+    operating_stage_score: float,
+    strategic_relations_score: float
+    ) -> dict:
+    """
+    Calculates valuation using the Checklist method.
+    """
+    print(f"Python function 'calculate_checklist_valuation' called.")
+    weights = {
+        "idea_quality": 0.20, "product_ip": 0.15, "core_team": 0.30,
+        "operating_stage": 0.20, "strategic_relations": 0.15
+    }
+    scores = {
+        "idea_quality": idea_quality_score / 100.0,
+        "product_ip": product_ip_score / 100.0,
+        "core_team": core_team_score / 100.0,
+        "operating_stage": operating_stage_score / 100.0,
+        "strategic_relations": strategic_relations_score / 100.0
+    }
+
+    valuation = 0
+    valuation_breakdown = {}
+
+    val_idea = max_valuation_assumption * weights["idea_quality"] * scores["idea_quality"]
+    valuation += val_idea
+    valuation_breakdown["Idea Quality Contribution"] = round(val_idea,2)
+
+    val_prod_ip = max_valuation_assumption * weights["product_ip"] * scores["product_ip"]
+    valuation += val_prod_ip
+    valuation_breakdown["Product/IP Contribution"] = round(val_prod_ip,2)
+
+    val_team = max_valuation_assumption * weights["core_team"] * scores["core_team"]
+    valuation += val_team
+    valuation_breakdown["Core Team Contribution"] = round(val_team,2)
+
+    val_op_stage = max_valuation_assumption * weights["operating_stage"] * scores["operating_stage"]
+    valuation += val_op_stage
+    valuation_breakdown["Operating Stage Contribution"] = round(val_op_stage,2)
+
+    val_strat_rel = max_valuation_assumption * weights["strategic_relations"] * scores["strategic_relations"]
+    valuation += val_strat_rel
+    valuation_breakdown["Strategic Relations Contribution"] = round(val_strat_rel,2)
+
+    return {
+        "method_name": "Checklist",
+        "valuation": round(valuation, 2),
+        "details": {
+            "max_valuation_assumption": max_valuation_assumption,
+            "inputs_scores_percent": {
+                "idea_quality_score": idea_quality_score,
+                "product_ip_score": product_ip_score,
+                "core_team_score": core_team_score,
+                "operating_stage_score": operating_stage_score,
+                "strategic_relations_score": strategic_relations_score
+            },
+            "valuation_breakdown": valuation_breakdown
+        }
+    }
+
+def calculate_dcf_valuation(
+    free_cash_flows: list[float],
+    survival_rates: list[float],
+    discount_rate: float,
+    terminal_value: float
+    ) -> float:
+    """Helper function for core DCF calculation."""
+    if len(free_cash_flows) != len(survival_rates):
+        raise ValueError("Length of free_cash_flows and survival_rates must be the same.")
+    n = len(free_cash_flows)
+    dcf_value = 0
+    for t_idx in range(n):
+        t = t_idx + 1
+        dcf_value += (free_cash_flows[t_idx] * survival_rates[t_idx]) / ((1 + discount_rate)**t)
+    dcf_value += (terminal_value * survival_rates[n-1]) / ((1 + discount_rate)**n)
+    return dcf_value
+
+def calculate_dcf_ltg_valuation(
+    free_cash_flows_projection: list[float],
+    survival_rates_projection: list[float],
+    discount_rate: float,
+    long_term_growth_rate: float
+    ) -> dict:
+    """Calculates valuation using DCF with Long-Term Growth method."""
+    print(f"Python function 'calculate_dcf_ltg_valuation' called.")
+    if not free_cash_flows_projection:
+        return {"error": "Free cash flow projection cannot be empty."}
+    if discount_rate <= long_term_growth_rate:
+        return {"error": "Discount rate must be greater than long-term growth rate for TV calculation."}
+
+    n = len(free_cash_flows_projection)
+    fcf_n = free_cash_flows_projection[-1]
+
+    terminal_value_ltg = (fcf_n * (1 + long_term_growth_rate)) / (discount_rate - long_term_growth_rate)
+
+    dcf_valuation_result = calculate_dcf_valuation(
+        free_cash_flows_projection, survival_rates_projection, discount_rate, terminal_value_ltg
+    )
+    return {
+        "method_name": "DCF w/ LTG",
+        "valuation": round(dcf_valuation_result, 2),
+        "details": {
+            "terminal_value_ltg": round(terminal_value_ltg, 2),
+            "inputs": {
+                "free_cash_flows_projection": free_cash_flows_projection,
+                "survival_rates_projection": survival_rates_projection,
+                "discount_rate": discount_rate,
+                "long_term_growth_rate": long_term_growth_rate
+            }
+        }
+    }
+
+def calculate_dcf_multiple_valuation(
+    free_cash_flows_projection: list[float],
+    survival_rates_projection: list[float],
+    discount_rate: float,
+    final_year_ebitda: float,
+    industry_multiple: float
+    ) -> dict:
+    """Calculates valuation using DCF with Exit Multiple method."""
+    print(f"Python function 'calculate_dcf_multiple_valuation' called.")
+    if not free_cash_flows_projection:
+        return {"error": "Free cash flow projection cannot be empty."}
+
+    terminal_value_multiple = final_year_ebitda * industry_multiple
+    dcf_valuation_result = calculate_dcf_valuation(
+        free_cash_flows_projection, survival_rates_projection, discount_rate, terminal_value_multiple
+    )
+    return {
+        "method_name": "DCF w/ Multiple",
+        "valuation": round(dcf_valuation_result, 2),
+        "details": {
+            "terminal_value_multiple": round(terminal_value_multiple, 2),
+            "inputs": {
+                "free_cash_flows_projection": free_cash_flows_projection,
+                "survival_rates_projection": survival_rates_projection,
+                "discount_rate": discount_rate,
+                "final_year_ebitda": final_year_ebitda,
+                "industry_multiple": industry_multiple
+            }
+        }
+    }
+
+def get_typical_roi_for_stage(business_stage: str) -> dict:
+    """Returns typical ROI (discount rate) for VC method based on business stage."""
+    print(f"Python function 'get_typical_roi_for_stage' called for stage: {business_stage}")
+    roi_table = {
+        "Idea": 1.3593,
+        "Startup": 1.1474,
+        "Development": 0.8912,
+        "Expansion": 0.4860,
+        "Growth": 0.3620
+    }
+    normalized_stage = business_stage.capitalize()
+    roi = roi_table.get(normalized_stage)
+    if roi is not None:
+        return {"business_stage": business_stage, "typical_roi": roi}
+    else:
+        return {"error": f"No typical ROI defined for stage '{business_stage}' in VC ROI table, or VC method not applicable."}
+
+def calculate_vc_method_valuation(
+    final_year_ebitda: float,
+    exit_multiple: float,
+    expected_roi: float,
+    years_to_exit: int,
+    capital_raised: float = 0
+    ) -> dict:
+    """Calculates pre-money valuation using the Venture Capital method."""
+    print(f"Python function 'calculate_vc_method_valuation' called.")
+    if (1 + expected_roi)**years_to_exit == 0:
+        return {"error": "Division by zero in VC method due to ROI and years to exit."}
+
+    terminal_value_at_exit = final_year_ebitda * exit_multiple
+    post_money_valuation_today = terminal_value_at_exit / ((1 + expected_roi)**years_to_exit)
+    pre_money_valuation = post_money_valuation_today - capital_raised
+
+    return {
+        "method_name": "VC Method",
+        "valuation": round(pre_money_valuation, 2),
+        "details": {
+            "terminal_value_at_exit": round(terminal_value_at_exit, 2),
+            "post_money_valuation_today": round(post_money_valuation_today, 2),
+            "inputs": {
+                "final_year_ebitda": final_year_ebitda,
+                "exit_multiple": exit_multiple,
+                "expected_roi": expected_roi,
+                "years_to_exit": years_to_exit,
+                "capital_raised": capital_raised
+            }
+        }
+    }
+
+# Tool name -> implementation, used by the valuation agent and the deterministic pipeline
+VALUATION_FUNCTIONS = {
+    "get_valuation_weights": get_valuation_weights,
+    "calculate_scorecard_valuation": calculate_scorecard_valuation,
+    "calculate_checklist_valuation": calculate_checklist_valuation,
+    "calculate_dcf_ltg_valuation": calculate_dcf_ltg_valuation,
+    "calculate_dcf_multiple_valuation": calculate_dcf_multiple_valuation,
+    "get_typical_roi_for_stage": get_typical_roi_for_stage,
+    "calculate_vc_method_valuation": calculate_vc_method_valuation,
+    "calculate_final_weighted_valuation": calculate_final_weighted_valuation,
+}
@@ -0,0 +1,201 @@
+# valuation_simulation.py
+"""
+Monte Carlo mode for the DCF w/ LTG, DCF w/ Multiple and VC method valuations.
+
+Uncertain inputs are given either as a plain number (held constant) or as a
+distribution spec, e.g. {"distribution": "normal", "mean": 0.2, "std": 0.03}.
+Every method is evaluated for all draws at once with NumPy, and the result is
+summarised as percentiles so the low/high bounds come from the simulation
+rather than from the LLM.
+
+Draws a method cannot value are NaN and reported as "invalid_draws" instead
+of entering the percentiles: a discount rate or expected ROI that is not
+positive, and for DCF w/ LTG a discount rate at or below the growth rate.
+The weighted total is invalid wherever one of its simulated methods is.
+"""
+import numpy as np
+from core.FCFFprojection import discount_factors
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+MAX_DRAWS = 1_000_000
+
+
+def sample_distribution(spec, size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw `size` samples from a distribution spec.
+
+    Supported specs:
+        number                                                  -> constant
+        {"distribution": "normal", "mean", "std"}
+        {"distribution": "lognormal", "mean", "sigma"}           (mean of the underlying normal is log(mean))
+        {"distribution": "uniform", "low", "high"}
+        {"distribution": "triangular", "low", "mode", "high"}
+    Optional "min"/"max" keys clip the samples. Any sign is returned as drawn;
+    rates that must be positive are invalidated by the caller, so pass
+    "min" to clip them instead.
+    """
+    if isinstance(spec, (int, float)):
+        return np.full(size, float(spec))
+    if not isinstance(spec, dict):
+        raise ValueError(f"Distribution spec must be a number or an object, got {type(spec).__name__}")
+    kind = spec.get("distribution", "normal")
+    if kind == "normal":
+        samples = rng.normal(spec["mean"], spec["std"], size)
+    elif kind == "lognormal":
+        samples = rng.lognormal(np.log(spec["mean"]), spec["sigma"], size)
+    elif kind == "uniform":
+        samples = rng.uniform(spec["low"], spec["high"], size)
+    elif kind == "triangular":
+        samples = rng.triangular(spec["low"], spec["mode"], spec["high"], size)
+    else:
+        raise ValueError(f"Unknown distribution: {kind}")
+    if "min" in spec or "max" in spec:
+        samples = np.clip(samples, spec.get("min", -np.inf), spec.get("max", np.inf))
+    return samples
+
+
+def sample_survival_rates(survival_rates: list[float], std: float, size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Perturb a survival-rate curve per draw with normal noise, clipped to [0, 1]
+    and kept non-increasing over time. Returns shape (size, years).
+    """
+    base = np.asarray(survival_rates, dtype=float)
+    if std <= 0:
+        return np.broadcast_to(base, (size, base.size))
+    samples = np.clip(base + rng.normal(0.0, std, (size, base.size)), 0.0, 1.0)
+    return np.minimum.accumulate(samples, axis=1)
+
+
+def _survival_weighted_dcf(free_cash_flows: np.ndarray, survival: np.ndarray, discount_rate: np.ndarray, terminal_value: np.ndarray) -> np.ndarray:
+    # Same formula as the DCF helper used by the valuation agent, for every draw at once
+    factors = discount_factors(discount_rate, free_cash_flows.shape[-1])
+    free_cash_flows = np.broadcast_to(free_cash_flows, factors.shape)
+    explicit = np.einsum("ij,ij,ij->i", free_cash_flows, survival, factors)
+    return explicit + terminal_value * survival[:, -1] * factors[:, -1]
+
+
+def simulate_dcf_ltg(free_cash_flows, survival, discount_rate, long_term_growth_rate) -> np.ndarray:
+    """DCF w/ LTG per draw; draws where discount rate <= growth are returned as NaN."""
+    free_cash_flows = np.asarray(free_cash_flows, dtype=float)
+    final_fcf = free_cash_flows[..., -1]
+    valid = discount_rate > long_term_growth_rate
+    spread = np.where(valid, discount_rate - long_term_growth_rate, np.nan)
+    terminal_value = final_fcf * (1 + long_term_growth_rate) / spread
+    return _survival_weighted_dcf(free_cash_flows, survival, discount_rate, terminal_value)
+
+
+def simulate_dcf_multiple(free_cash_flows, survival, discount_rate, final_year_ebitda, industry_multiple) -> np.ndarray:
+    """DCF w/ Multiple per draw."""
+    free_cash_flows = np.asarray(free_cash_flows, dtype=float)
+    return _survival_weighted_dcf(free_cash_flows, survival, discount_rate, final_year_ebitda * industry_multiple)
+
+
+def simulate_vc_method(final_year_ebitda, exit_multiple, expected_roi, years_to_exit: int, capital_raised: float = 0) -> np.ndarray:
+    """VC method pre-money valuation per draw."""
+    return final_year_ebitda * exit_multiple / np.power(1 + expected_roi, years_to_exit) - capital_raised
+
+
+def summarize_draws(values: np.ndarray, percentiles=DEFAULT_PERCENTILES) -> dict:
+    """Percentiles, mean and low/high bounds of the finite draws."""
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return {"error": "No valid draws for this method.", "invalid_draws": int(values.size)}
+    points = np.percentile(finite, percentiles)
+    summary = {f"p{p:g}": round(float(v), 2) for p, v in zip(percentiles, points)}
+    summary.update({
+        "mean": round(float(finite.mean()), 2),
+        "low_bound": round(float(points[0]), 2),
+        "high_bound": round(float(points[-1]), 2),
+        "invalid_draws": int(values.size - finite.size)
+    })
+    return summary
+
+
+def run_monte_carlo_valuation(
+    free_cash_flows: list[float],
+    survival_rates: list[float],
+    final_year_ebitda,
+    discount_rate,
+    long_term_growth_rate,
+    industry_multiple,
+    exit_multiple,
+    expected_roi,
+    years_to_exit: int = 5,
+    capital_raised: float = 0,
+    survival_rate_std: float = 0.0,
+    cash_flow_scale=1.0,
+    weights: dict = None,
+    fixed_valuations: dict = None,
+    n_draws: int = 100_000,
+    seed: int = None,
+    percentiles=DEFAULT_PERCENTILES
+) -> dict:
+    """
+    Simulate the three cash-flow based valuation methods.
+
+    Args:
+        free_cash_flows (list[float]): Projected FCF per year
+        survival_rates (list[float]): Survival rate per year (0-1), same length as free_cash_flows
+        final_year_ebitda, discount_rate, long_term_growth_rate, industry_multiple,
+        exit_multiple, expected_roi, cash_flow_scale: Number or distribution spec
+            (cash_flow_scale multiplies the whole FCF projection per draw)
+        years_to_exit (int): Years until exit for the VC method
+        capital_raised (float): Capital already raised, deducted in the VC method
+        survival_rate_std (float): Per-year noise applied to the survival curve
+        weights (dict, optional): Method weights (e.g. from get_valuation_weights) to also
+            simulate the final weighted valuation
+        fixed_valuations (dict, optional): Point values for non-simulated methods
+            (e.g. {"Scorecard": 1.2e6, "Checklist": 9e5}) included in the weighted total
+        n_draws (int): Number of draws (capped at MAX_DRAWS)
+        seed (int, optional): RNG seed for reproducible runs
+        percentiles (tuple): Percentiles to report
+
+    Returns:
+        dict: Summary per method, plus "Weighted" when weights are given; each
+            reports its invalid_draws (see the module docstring)
+    """
+    if len(free_cash_flows) != len(survival_rates):
+        return {"error": "Length of free_cash_flows and survival_rates must be the same."}
+    if not free_cash_flows:
+        return {"error": "Free cash flow projection cannot be empty."}
+    n_draws = int(min(max(n_draws, 1), MAX_DRAWS))
+    rng = np.random.default_rng(seed)
+
+    discount = sample_distribution(discount_rate, n_draws, rng)
+    growth = sample_distribution(long_term_growth_rate, n_draws, rng)
+    ebitda = sample_distribution(final_year_ebitda, n_draws, rng)
+    multiple = sample_distribution(industry_multiple, n_draws, rng)
+    vc_multiple = sample_distribution(exit_multiple, n_draws, rng)
+    roi = sample_distribution(expected_roi, n_draws, rng)
+    # Non-positive rates make no sense for discounting; those draws become invalid
+    discount = np.where(discount > 0, discount, np.nan)
+    roi = np.where(roi > 0, roi, np.nan)
+    survival = sample_survival_rates(survival_rates, survival_rate_std, n_draws, rng)
+    fcf = np.asarray(free_cash_flows, dtype=float)
+    if not isinstance(cash_flow_scale, (int, float)) or cash_flow_scale != 1.0:
+        fcf = fcf * sample_distribution(cash_flow_scale, n_draws, rng)[:, None]
+
+    draws = {
+        "DCF w/ LTG": simulate_dcf_ltg(fcf, survival, discount, growth),
+        "DCF w/ Multiple": simulate_dcf_multiple(fcf, survival, discount, ebitda, multiple),
+        "VC Method": simulate_vc_method(ebitda, vc_multiple, roi, years_to_exit, capital_raised),
+    }
+    result = {name: summarize_draws(values, percentiles) for name, values in draws.items()}
+
+    if weights:
+        weighted = np.zeros(n_draws)
+        invalid_by_method = {}
+        for name, weight in weights.items():
+            if not weight:
+                continue
+            if name in draws:
+                weighted += draws[name] * weight
+                invalid_by_method[name] = int(np.count_nonzero(~np.isfinite(draws[name])))
+            elif fixed_valuations and name in fixed_valuations:
+                weighted += fixed_valuations[name] * weight
+        result["Weighted"] = summarize_draws(weighted, percentiles)
+        # Which methods the draws missing from the weighted total came from
+        result["Weighted"]["invalid_draws_by_method"] = invalid_by_method
+
+    result["n_draws"] = n_draws
+    return result
@@ -1,70 +1,398 @@
 # crud.py
-from db.mongodb import db
-from models.question import UserQA
+from db.mongodb import db, report_db
+from bson import Binary, ObjectId
+from pymongo import ReturnDocument
+import gridfs
+import uuid
+import zlib
+from core.config import PDF_TEXT_COMPRESS_MIN_BYTES, PDF_TEXT_GRIDFS_MIN_BYTES
+from models.question import UserQA, QAItem
 from models.PDFMODEL import PDFFORMAT
-import json
 
-def save_user_qa(user_qa: UserQA, pdf_id: str):
+def save_user_qa(user_qa: UserQA, pdf_id: str) -> str:
+    """
+    Replace the user's Q&A with a new questionnaire.
+
+    Returns:
+        str: Generation token of this questionnaire; pdf_id is reused across a user's
+            uploads, so background appends pass the token to find the same one
+    """
+    qa_doc = user_qa.model_dump()
+    generation = uuid.uuid4().hex
     db.user_qas.update_one(
         {"user_id": user_qa.user_id},
         {"$set": {
-            "user_qa":user_qa.model_dump(),
-            "pdf_id": pdf_id
+            "user_qa":qa_doc,
+            "pdf_id": pdf_id,
+            "generation": generation,
+            **_qa_progress(qa_doc["qas"])
         }},
         upsert=True
     )
+    return generation
     
-def save_pdf_text(user_id: str, pdf_text: str):
-    result = db.pdf_texts.update_one(
+# Blob text encodings: plain {"text"} below PDF_TEXT_COMPRESS_MIN_BYTES, zlib-compressed
+# {"data"} above it, and a GridFS file (id = the pdf hash) once the compressed text reaches
+# PDF_TEXT_GRIDFS_MIN_BYTES, well under the 16 MB document limit.
+
+def _pdf_blob_files():
+    return gridfs.GridFS(db, collection="pdf_blob_files")
+
+def get_pdf_blob_text(pdf_hash: str):
+    """Return the extracted text stored for a PDF content hash, or None if never extracted."""
+    blob = db.pdf_blobs.find_one({"_id": pdf_hash}, {"text": 1, "data": 1, "gridfs_id": 1})
+    if not blob:
+        return None
+    if "text" in blob:
+        return blob["text"]
+    if "gridfs_id" in blob:
+        data = _pdf_blob_files().get(blob["gridfs_id"]).read()
+    else:
+        data = blob["data"]
+    return zlib.decompress(data).decode("utf-8")
+
+def save_pdf_blob(pdf_hash: str, pdf_text: str):
+    # Content-addressed: identical uploads share one copy of the text
+    encoded = pdf_text.encode("utf-8")
+    if len(encoded) < PDF_TEXT_COMPRESS_MIN_BYTES:
+        fields = {"text": pdf_text}
+    else:
+        data = zlib.compress(encoded, 6)
+        fields = {"encoding": "zlib", "size": len(encoded)}
+        if len(data) < PDF_TEXT_GRIDFS_MIN_BYTES:
+            fields["data"] = Binary(data)
+        else:
+            try:
+                _pdf_blob_files().put(data, _id=pdf_hash)
+            except gridfs.errors.FileExists:
+                pass  # a concurrent upload of the same PDF stored it first
+            fields["gridfs_id"] = pdf_hash
+    db.pdf_blobs.update_one(
+        {"_id": pdf_hash},
+        {"$setOnInsert": fields},
+        upsert=True
+    )
+
+# Retrieval chunks (core/retrieval.py), keyed by the PDF hash like the blobs
+MAX_CHUNKS_DOC_CHARS = 12 * 1024 * 1024
+
+def get_pdf_chunks(pdf_hash: str):
+    doc = db.pdf_chunks.find_one({"_id": pdf_hash}, {"chunks": 1})
+    return doc["chunks"] if doc else None
+
+def save_pdf_chunks(pdf_hash: str, chunks: list):
+    if sum(len(chunk) for chunk in chunks) > MAX_CHUNKS_DOC_CHARS:
+        # Too large for one document; retrieval re-chunks it from the blob text instead
+        print(f"Not storing chunks for {pdf_hash}: document too large")
+        return
+    db.pdf_chunks.update_one(
+        {"_id": pdf_hash},
+        {"$setOnInsert": {"chunks": chunks}},
+        upsert=True
+    )
+
+def load_pdf_text(pdf_doc: dict):
+    """Resolve the text of a pdf_texts document, following its pdf_hash to the shared blob."""
+    if not pdf_doc:
+        return None
+    if pdf_doc.get("pdf_text") is None and pdf_doc.get("pdf_hash"):
+        pdf_doc["pdf_text"] = get_pdf_blob_text(pdf_doc["pdf_hash"])
+    return pdf_doc.get("pdf_text")
+
+def save_pdf_text(user_id: str, pdf_hash: str):
+    doc = db.pdf_texts.find_one_and_update(
         {"user_id": user_id},
-        {"$set": {"pdf_text": pdf_text}},
+        {"$set": {"pdf_hash": pdf_hash}, "$unset": {"pdf_text": ""}},
+        projection={"_id": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return str(doc["_id"])
+
+def get_pdf_doc(pdf_id: str, projection: dict = None):
+    """Return a pdf_texts document by id; the text is hydrated unless a projection is given."""
+    doc = db.pdf_texts.find_one({"_id": ObjectId(pdf_id)}, projection)
+    if projection is None:
+        load_pdf_text(doc)
+    return doc
+
+def get_user_qa_by_pdf(pdf_id: str):
+    return db.user_qas.find_one({"pdf_id": pdf_id})
+
+def save_valuation_results(pdf_id: str, user_id: str, fields: dict):
+    db.valuation_results.update_one(
+        {"pdf_id": pdf_id, "user_id": user_id},
+        {"$set": fields},
+        upsert=True
+    )
+
+def get_forecast_thread(pdf_id: str, window: int = None):
+    """
+    Return the FCFF conversation document for a PDF.
+
+    Args:
+        pdf_id (str): The PDF's id
+        window (int): If given, only the last `window` edit/forecast pairs of
+            the append-only messages array are read
+
+    Returns:
+        dict: prompt, latest_forecast, summary, edit_count, approved and messages, or None
+    """
+    projection = {"messages": {"$slice": -2 * window}} if window else None
+    return db.forecast_msgs.find_one({"pdf_id": pdf_id}, projection)
+
+def get_approved_forecast_messages(pdf_id: str):
+    doc = db.forecast_msgs.find_one(
+        {"pdf_id": pdf_id, "approved": True},
+        {"latest_forecast": 1, "messages": {"$slice": -1}}
+    )
+    if not doc:
+        return None
+    if doc.get("latest_forecast"):
+        return [{"role": "assistant", "content": doc["latest_forecast"]}]
+    return doc.get("messages") or []
+
+def start_forecast_thread(pdf_id: str, prompt: str, forecast: str):
+    """Start (or restart) a PDF's FCFF conversation with its first forecast."""
+    db.forecast_msgs.update_one(
+        {"pdf_id": pdf_id},
+        {"$set": {
+            "prompt": prompt,
+            "latest_forecast": forecast,
+            "summary": "",
+            "edit_count": 0,
+            "messages": [{"role": "user", "content": prompt}, {"role": "assistant", "content": forecast}],
+        }},
+        upsert=True
+    )
+
+def append_forecast_revision(pdf_id: str, edit: str, forecast: str, summary: str = None):
+    """Append one user edit and the revised forecast without rewriting the history."""
+    fields = {"latest_forecast": forecast}
+    if summary is not None:
+        fields["summary"] = summary
+    db.forecast_msgs.update_one(
+        {"pdf_id": pdf_id},
+        {
+            "$push": {"messages": {"$each": [
+                {"role": "user", "content": edit},
+                {"role": "assistant", "content": forecast},
+            ]}},
+            "$set": fields,
+            "$inc": {"edit_count": 1},
+        }
+    )
+
+def save_forecast_state(pdf_id: str, fields: dict):
+    db.forecast_msgs.update_one({"pdf_id": pdf_id}, {"$set": fields})
+
+def approve_forecast(pdf_id: str, forecast_results: str):
+    """Store the approved FCFF table on the PDF and mark its conversation as approved."""
+    db.pdf_texts.update_one(
+        {"_id": ObjectId(pdf_id)},
+        {"$set": {"forecast_results": forecast_results}}
+    )
+    db.forecast_msgs.update_one(
+        {"pdf_id": pdf_id},
+        {"$set": {"approved": True}}
+    )
+
+def get_report_context(key: str):
+    doc = db.report_contexts.find_one({"_id": key}, {"digest": 1})
+    return doc["digest"] if doc else None
+
+def save_report_context(key: str, digest: str):
+    db.report_contexts.update_one({"_id": key}, {"$setOnInsert": {"digest": digest}}, upsert=True)
+
+# Report database (MONGODB_REPORT_DB_NAME)
+
+def get_report_inputs(document_id: ObjectId):
+    """Return (eval_text, pdf_text) of a report input document, or (None, None)."""
+    data = report_db.user_qa.find_one({"_id": document_id}, {"eval_text": 1, "pdf_text": 1})
+    if not data:
+        return None, None
+    return data.get("eval_text"), data.get("pdf_text")
+
+def get_user_context(user_id: str):
+    """Return all (pdf_texts, user_qas) documents of a user, the inputs of the report personas."""
+    pdf_texts = list(report_db.pdf_texts.find({"user_id": user_id}))
+    user_qas = list(report_db.user_qas.find({"user_id": user_id}))
+    return pdf_texts, user_qas
+
+def push_report_result(user_id: str, result: dict):
+    report_db.report_data.update_one(
+        {"user_id": user_id},
+        {"$push": {"results": result}},
         upsert=True
     )
-    if result.upserted_id:
-        return str(result.upserted_id)
-    else:
-        # If document was updatPDF(not inserted), find and retur.pdf_texts
-        doc = db.pdf_texts.find_one({"user_id": user_id})
-        return str(doc["_id"]) if doc else None
 
 def get_user_qa(user_id: str):
     data = db.user_qas.find_one({"user_id": user_id})
     return data
 def get_user_PDF(user_id: str):
     data = db.pdf_texts.find_one({"user_id": user_id})
+    load_pdf_text(data)
     return data
 
-# New: Update answer for a question index and return next question (if any)
+# Answer submission. user_qas documents keep a next_unanswered pointer (index of the
+# first unanswered question, None once all are answered), its next_question text and
+# an answered_count, so an answer is one find_one_and_update returning only those fields.
+
+def _is_answered(answer_expr):
+    return {"$ne": [{"$ifNull": [answer_expr, ""]}, ""]}
+
+def _qa_progress(qas: list) -> dict:
+    next_index = next((i for i, qa in enumerate(qas) if not qa.get("answer")), None)
+    return {
+        "next_unanswered": next_index,
+        "next_question": qas[next_index]["question"] if next_index is not None else None,
+        "answered_count": sum(1 for qa in qas if qa.get("answer"))
+    }
+
+# Documents written before the pointer existed get their answered_count computed once
+_ANSWERED_COUNT_OR_BACKFILL = {"$cond": [
+    {"$eq": [{"$type": "$answered_count"}, "missing"]},
+    {"$size": {"$filter": {"input": "$user_qa.qas", "as": "qa", "cond": _is_answered("$$qa.answer")}}},
+    "$answered_count"
+]}
+
+def _merge_answers_expr(indexes: list, answers: list) -> dict:
+    """Expression for user_qa.qas with answers[k] written to question indexes[k]."""
+    return {"$map": {"input": {"$range": [0, {"$size": "$user_qa.qas"}]}, "as": "i", "in": {"$let": {
+        "vars": {
+            "qa": {"$arrayElemAt": ["$user_qa.qas", "$$i"]},
+            "pos": {"$indexOfArray": [{"$literal": indexes}, "$$i"]}
+        },
+        "in": {"$cond": [
+            {"$eq": ["$$pos", -1]},
+            "$$qa",
+            {"$mergeObjects": ["$$qa", {"answer": {"$arrayElemAt": [{"$literal": answers}, "$$pos"]}}]}
+        ]}
+    }}}}
+
+def _advance_pointer_stages(scan_from) -> list:
+    """
+    Pipeline stages moving next_unanswered to the first unanswered question at or
+    after scan_from (every question before the old pointer is already answered).
+    """
+    return [
+        {"$set": {"next_unanswered": {"$let": {
+            "vars": {"index": {"$indexOfArray": [
+                {"$map": {"input": "$user_qa.qas", "as": "qa", "in": {"$not": [_is_answered("$$qa.answer")]}}},
+                True,
+                scan_from
+            ]}},
+            "in": {"$cond": [{"$eq": ["$$index", -1]}, None, "$$index"]}
+        }}}},
+        {"$set": {"next_question": {"$cond": [
+            {"$eq": ["$next_unanswered", None]},
+            None,
+            {"$let": {"vars": {"qa": {"$arrayElemAt": ["$user_qa.qas", "$next_unanswered"]}}, "in": "$$qa.question"}}
+        ]}}},
+    ]
+
+def _apply_answers(user_id: str, pdf_id: str, answers: dict, projection: dict):
+    """
+    Write {question_index: answer} to a user_qas document in one pipeline update and
+    advance its pointer. Returns the projected document, or None if the document does
+    not exist or any index is out of range (nothing is written then).
+    """
+    indexes = list(answers)
+    values = [answers[i] for i in indexes]
+    previously_answered = {"$size": {"$filter": {"input": {"$literal": indexes}, "as": "i", "cond": _is_answered(
+        {"$let": {"vars": {"qa": {"$arrayElemAt": ["$user_qa.qas", "$$i"]}}, "in": "$$qa.answer"}})}}}
+    pipeline = [
+        # Both fields are computed from the document as it was before this stage
+        {"$set": {
+            "answered_count": {"$add": [
+                _ANSWERED_COUNT_OR_BACKFILL,
+                sum(1 for value in values if value),
+                {"$multiply": [previously_answered, -1]}
+            ]},
+            "user_qa.qas": _merge_answers_expr(indexes, values)
+        }},
+        *_advance_pointer_stages({"$min": [{"$ifNull": ["$next_unanswered", 0]}, min(indexes)]})
+    ]
+    return db.user_qas.find_one_and_update(
+        {"user_id": user_id, "pdf_id": pdf_id, f"user_qa.qas.{max(indexes)}": {"$exists": True}},
+        pipeline,
+        projection=projection,
+        return_document=ReturnDocument.AFTER
+    )
+
+def append_questions(user_id: str, pdf_id: str, generation: str, questions: list) -> bool:
+    """
+    Add questions to the end of a user's Q&A in one update, pointing next_unanswered
+    at the first of them if everything before was already answered.
+
+    Args:
+        generation (str): Token returned by save_user_qa for the questionnaire to extend
+
+    Returns:
+        bool: False if that questionnaire no longer exists, i.e. a new upload replaced it
+    """
+    if not questions:
+        return True
+    new_qas = [QAItem(question=q).model_dump() for q in questions]
+    result = db.user_qas.update_one(
+        {"user_id": user_id, "pdf_id": pdf_id, "generation": generation},
+        [
+            {"$set": {
+                "answered_count": _ANSWERED_COUNT_OR_BACKFILL,
+                "user_qa.qas": {"$concatArrays": ["$user_qa.qas", {"$literal": new_qas}]}
+            }},
+            *_advance_pointer_stages({"$ifNull": ["$next_unanswered", 0]})
+        ]
+    )
+    return result.matched_count > 0
 
 def update_answer_and_get_next(user_id: str,pdf_id: str, question_index: int, answer: str):
-    print(f"Updating answer for question {user_id} to {pdf_id}")
-    user_qa = db.user_qas.find_one({"user_id": user_id,"pdf_id":pdf_id})
-    
-    # Convert user_qa to JSON if it's a string
-    if isinstance(user_qa, str):
-        try:
-            user_qa = json.loads(user_qa)
-            print("Successfully converted user_qa string to JSON")
-        except json.JSONDecodeError as e:
-            print(f"Error converting user_qa to JSON: {str(e)}")
-            return None, None
-    user_qa= user_qa["user_qa"]['qas']
-    print(f"User QA: {user_qa}")
-
-    if not user_qa or question_index >= len(user_qa):
-        print("No user_qa or qas found")
+    """
+    Store one answer and return the next unanswered question in a single round trip.
+
+    Returns:
+        tuple: (next_index, next_question), or (None, None) when all questions are
+            answered or the document/question does not exist
+    """
+    if question_index < 0:
         return None, None
-    # Update answer
-    qas = user_qa
-    qas[question_index]["answer"] = answer
-    print(f"Updating answer for question {question_index} to {answer}")
-    db.user_qas.update_one(
-        {"user_id": user_id,"pdf_id":pdf_id},
-        {"$set": {f"user_qa.qas.{question_index}.answer": answer}}
-    )
-    # Find next unanswered question
-    for idx, qa in enumerate(qas):
-        if not qa.get("answer"):
-            print(f"Found next unanswered question {idx}")
-            return idx, qa["question"]
-    return None, None  # All answered 
\ No newline at end of file
+    print(f"Updating answer {question_index} for user {user_id}, pdf {pdf_id}")
+    doc = _apply_answers(user_id, pdf_id, {question_index: answer}, {"_id": 0, "next_unanswered": 1, "next_question": 1})
+    if not doc or doc.get("next_unanswered") is None:
+        return None, None
+    return doc["next_unanswered"], doc["next_question"]
+
+def update_answers_and_get_next(user_id: str, pdf_id: str, answers: list):
+    """
+    Store many answers in a single update.
+
+    Args:
+        answers (list): (question_index, answer) pairs; a repeated index keeps the last answer
+
+    Returns:
+        dict: next_index, next_question, answered_count and question_count,
+            or {"error": ...} if the Q&A document or a question index does not exist
+    """
+    by_index = {}
+    for question_index, answer in answers:
+        if question_index < 0:
+            return {"error": f"Invalid question index: {question_index}"}
+        by_index[question_index] = answer
+    if not by_index:
+        return {"error": "No answers given"}
+    print(f"Updating {len(by_index)} answers for user {user_id}, pdf {pdf_id}")
+    doc = _apply_answers(user_id, pdf_id, by_index, {
+        "_id": 0,
+        "next_unanswered": 1,
+        "next_question": 1,
+        "answered_count": 1,
+        "question_count": {"$size": "$user_qa.qas"}
+    })
+    if not doc:
+        return {"error": "Questions not found for this user and PDF, or a question index is out of range"}
+    return {
+        "next_index": doc.get("next_unanswered"),
+        "next_question": doc.get("next_question"),
+        "answered_count": doc.get("answered_count"),
+        "question_count": doc.get("question_count")
+    }
@@ -0,0 +1,125 @@
+# indexes.py
+"""
+Declared indexes for every hot query, created idempotently at startup.
+
+Run ``python -m db.indexes`` to create them by hand, or
+``python -m db.indexes --check`` to report declared indexes that are missing
+and existing ones that $indexStats shows were never used since the last
+server restart.
+"""
+import sys
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from db.mongodb import db, report_db
+from core.config import LLM_CACHE_TTL_SECONDS
+
+INDEX_OPTIONS_CONFLICT = 85
+
+# (database, collection, keys, options); the main database is "db", the report database is "report_db"
+INDEXES = [
+    # update_answer_and_get_next, save_user_qa
+    ("db", "user_qas", [("user_id", ASCENDING), ("pdf_id", ASCENDING)], {}),
+    # get_user_qa_by_pdf (valuation and FCFF prompts)
+    ("db", "user_qas", [("pdf_id", ASCENDING)], {}),
+    # FCFF conversation per PDF
+    ("db", "forecast_msgs", [("pdf_id", ASCENDING)], {}),
+    ("db", "valuation_results", [("pdf_id", ASCENDING), ("user_id", ASCENDING)], {}),
+    # save_pdf_text, get_user_PDF; unique so concurrent upserts cannot create a second document per user
+    ("db", "pdf_texts", [("user_id", ASCENDING)], {"unique": True}),
+    # JobQueue heartbeat: fail unfinished jobs whose lease expired, renew this process's leases
+    ("db", "jobs", [("status", ASCENDING), ("lease_until", ASCENDING)], {}),
+    ("db", "jobs", [("owner", ASCENDING), ("status", ASCENDING)], {}),
+    ("db", "llm_cache", [("created_at", ASCENDING)], {"expireAfterSeconds": LLM_CACHE_TTL_SECONDS}),
+    # get_user_context, push_report_result
+    ("report_db", "pdf_texts", [("user_id", ASCENDING)], {}),
+    ("report_db", "user_qas", [("user_id", ASCENDING)], {}),
+    ("report_db", "report_data", [("user_id", ASCENDING)], {}),
+]
+
+_databases = {"db": db, "report_db": report_db}
+
+
+def index_name(keys) -> str:
+    # Same naming scheme as the server's default, so existing indexes are recognised
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def ensure_indexes(indexes=INDEXES):
+    """
+    Create every declared index. Existing indexes are left as they are, except
+    for a changed TTL, which is updated in place with collMod, and an index
+    declared unique, which is rebuilt once no duplicate keys remain.
+
+    Returns:
+        list: Names ("database.collection.index") of the indexes that were created or updated
+    """
+    changed = []
+    for database, collection_name, keys, options in indexes:
+        collection = _databases[database][collection_name]
+        name = index_name(keys)
+        existing = collection.index_information().get(name)
+        if existing and all(existing.get(option) == options.get(option) for option in ("expireAfterSeconds", "unique")):
+            continue
+        try:
+            collection.create_indexes([IndexModel(keys, name=name, **options)])
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            if "expireAfterSeconds" in options:
+                collection.database.command("collMod", collection_name, index={
+                    "name": name, "expireAfterSeconds": options["expireAfterSeconds"]})
+            elif options.get("unique"):
+                _rebuild_unique(collection, keys, name, options)
+            else:
+                raise
+        changed.append(f"{collection.database.name}.{collection_name}.{name}")
+    if changed:
+        print(f"Indexes created/updated: {changed}")
+    return changed
+
+
+def _rebuild_unique(collection, keys, name: str, options: dict):
+    # Check for duplicates first, so a failed rebuild never leaves the collection without the index
+    group = {"_id": {field: f"${field}" for field, _ in keys}, "count": {"$sum": 1}}
+    duplicate = next(collection.aggregate([{"$group": group}, {"$match": {"count": {"$gt": 1}}}, {"$limit": 1}]), None)
+    if duplicate:
+        raise RuntimeError(f"Cannot make {collection.name}.{name} unique: {duplicate['count']} documents share "
+                           f"{duplicate['_id']}; remove the duplicates and restart")
+    collection.drop_index(name)
+    collection.create_indexes([IndexModel(keys, name=name, **options)])
+
+
+def check_indexes(indexes=INDEXES) -> dict:
+    """
+    Compare the declared indexes with the ones on the server.
+
+    Returns:
+        dict: {"missing": [...], "unused": [...]} of "database.collection.index"
+            names. "unused" lists indexes (other than _id) with no recorded
+            access in $indexStats, whose counters reset on server restart.
+    """
+    declared = {}
+    for database, collection_name, keys, _ in indexes:
+        declared.setdefault((database, collection_name), set()).add(index_name(keys))
+
+    missing, unused = [], []
+    for (database, collection_name), names in declared.items():
+        collection = _databases[database][collection_name]
+        stats = list(collection.aggregate([{"$indexStats": {}}]))
+        present = {stat["name"] for stat in stats}
+        label = f"{collection.database.name}.{collection_name}"
+        missing.extend(f"{label}.{name}" for name in sorted(names - present))
+        unused.extend(
+            f"{label}.{stat['name']}" for stat in stats
+            if stat["name"] != "_id_" and stat.get("accesses", {}).get("ops", 0) == 0
+        )
+    return {"missing": missing, "unused": unused}
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        report = check_indexes()
+        print(f"Missing indexes: {report['missing'] or 'none'}")
+        print(f"Unused indexes: {report['unused'] or 'none'}")
+    else:
+        ensure_indexes()
@@ -1,5 +1,47 @@
-from pymongo import MongoClient
-from core.config import MONGODB_URI
+from pymongo import AsyncMongoClient, MongoClient
+from core.config import (
+    MONGODB_URI,
+    MONGODB_DB_NAME,
+    MONGODB_REPORT_DB_NAME,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+)
 
-client = MongoClient(MONGODB_URI)
-db = client["valoov"] 
\ No newline at end of file
+def client_options() -> dict:
+    """Connection pool settings shared by the sync and async clients (0 = no timeout)."""
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS or None,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS or None,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS or None,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS or None,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+    }
+
+# One pooled client per process; every module goes through db/crud.py or these handles
+client = MongoClient(MONGODB_URI, **client_options())
+db = client[MONGODB_DB_NAME]
+report_db = client[MONGODB_REPORT_DB_NAME]
+
+_async_client = None
+
+def get_async_db(name: str = MONGODB_DB_NAME):
+    """Database handle on the shared AsyncMongoClient, created on first use."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncMongoClient(MONGODB_URI, **client_options())
+    return _async_client[name]
+
+async def close_clients():
+    """Close the pooled connections. Called from the FastAPI lifespan on shutdown."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    client.close()
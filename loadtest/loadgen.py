@@ -0,0 +1,273 @@
+# loadgen.py
+"""
+Open-loop load generator for the API.
+
+Requests are started at a fixed (or Poisson) rate regardless of how fast
+earlier ones finish, so queueing shows up as latency instead of silently
+lowering the offered load. A setup phase first creates a few users with an
+uploaded PDF, some answers and an approved FCFF forecast, so the answer, FCFF
+and valuation scenarios have data to work on.
+
+Scenarios (weights via --mix):
+
+- ``generate``: POST /api/v1/questions/generate with a synthetic PDF
+- ``answer``: POST /api/v1/questions/answer
+- ``batch``: POST /api/v1/questions/answers:batch
+- ``fcff``: POST /api/v1/fcff-projection/ (a revision of the setup forecast)
+- ``valuation``: POST /api/v1/valuation, plus ``valuation_job`` end-to-end
+  latency when --wait-jobs polls the job to completion
+
+Usage::
+
+    python -m loadtest.loadgen --base-url http://127.0.0.1:8000 --rps 10 --duration 60 \\
+        --mix generate=1,answer=5,batch=2,fcff=1,valuation=1 --wait-jobs --output results.json
+
+Run the API against loadtest/mock_llm.py with LLM_CACHE_ENABLED=false, or
+every repeated prompt is served from the LLM cache.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import httpx
+
+from loadtest.pdfgen import synthetic_pdf
+
+SCENARIOS = ("generate", "answer", "batch", "fcff", "valuation")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class LoadGenerator:
+    def __init__(self, client: httpx.AsyncClient, args):
+        self.client = client
+        self.args = args
+        self.pdfs = [synthetic_pdf(args.pdf_pages, seed=seed) for seed in range(args.pdf_variants)]
+        # Setup users: {"user_id", "pdf_id", "next_index"}
+        self.users = []
+        self.results = []
+        self.skipped = 0
+
+    async def request(self, scenario: str, method: str, path: str, **kwargs):
+        """Send one request and record its latency and outcome; returns the parsed body or None."""
+        started = time.perf_counter()
+        status, body, error = None, None, None
+        try:
+            response = await self.client.request(method, path, **kwargs)
+            status = response.status_code
+            body = response.json()
+            if status >= 400 or (isinstance(body, dict) and "error" in body):
+                error = str(body.get("error") if isinstance(body, dict) else body)[:200]
+        except (httpx.HTTPError, ValueError) as e:
+            error = f"{type(e).__name__}: {str(e)}"[:200]
+        self.results.append({
+            "scenario": scenario,
+            "latency": time.perf_counter() - started,
+            "status": status,
+            "ok": error is None,
+            "error": error,
+        })
+        return body if error is None else None
+
+    async def generate(self, user_id: str = None):
+        user_id = user_id or f"load-{uuid.uuid4().hex[:12]}"
+        files = {"pdf": ("deck.pdf", random.choice(self.pdfs), "application/pdf")}
+        data = {"user_id": user_id, "num_questions": str(self.args.num_questions)}
+        return await self.request("generate", "POST", "/api/v1/questions/generate", data=data, files=files)
+
+    async def answer(self):
+        user = random.choice(self.users)
+        body = await self.request("answer", "POST", "/api/v1/questions/answer", json={
+            "user_id": user["user_id"], "pdf_id": user["pdf_id"],
+            "question_index": user["next_index"], "answer": "Load test answer",
+        })
+        if body and body.get("question_index") is not None:
+            user["next_index"] = body["question_index"]
+
+    async def batch(self, user: dict = None, count: int = 5):
+        user = user or random.choice(self.users)
+        answers = [{"question_index": user["next_index"] + i, "answer": f"Load test answer {i}"} for i in range(count)]
+        body = await self.request("batch", "POST", "/api/v1/questions/answers:batch", json={
+            "user_id": user["user_id"], "pdf_id": user["pdf_id"], "answers": answers,
+        })
+        if body and body.get("question_index") is not None:
+            user["next_index"] = body["question_index"]
+
+    async def fcff(self, user: dict = None, message: str = "Increase the revenue growth rate to 35%."):
+        user = user or random.choice(self.users)
+        return await self.request("fcff", "POST", "/api/v1/fcff-projection/",
+                                  json={"pdf_id": user["pdf_id"], "userMSG": message})
+
+    async def valuation(self):
+        user = random.choice(self.users)
+        started = time.perf_counter()
+        body = await self.request("valuation", "POST", "/api/v1/valuation", json={
+            "pdf_id": user["pdf_id"], "user_id": user["user_id"], "fast_path": self.args.fast_path,
+        })
+        if not body or not self.args.wait_jobs:
+            return
+        status_url = body["status_url"]
+        job = {}
+        deadline = started + self.args.timeout
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(self.args.poll_interval)
+            try:
+                job = (await self.client.get(status_url)).json()
+            except (httpx.HTTPError, ValueError):
+                continue
+            if job.get("status") in FINISHED_STATUSES:
+                break
+        result = (job.get("result") or {}).get("result")
+        error = job.get("error") or (result.get("error") if isinstance(result, dict) else None)
+        if job.get("status") != "succeeded" and not error:
+            error = f"Job {job.get('status', 'timed out')}"
+        self.results.append({
+            "scenario": "valuation_job",
+            "latency": time.perf_counter() - started,
+            "status": job.get("status"),
+            "ok": error is None,
+            "error": str(error)[:200] if error else None,
+        })
+
+    async def setup(self):
+        """Create the users the answer/FCFF/valuation scenarios act on."""
+        for _ in range(self.args.setup_users):
+            body = await self.generate()
+            if not body:
+                continue
+            user = {"user_id": body["user_id"], "pdf_id": body["pdf_id"], "next_index": 0}
+            await self.batch(user, count=10)
+            # First call creates the forecast, the second approves it for the valuation
+            await self.fcff(user, message="Create the forecast.")
+            await self.fcff(user, message="approved")
+            self.users.append(user)
+        self.results.clear()
+        if not self.users:
+            raise RuntimeError("Setup failed: no user could be created; check the API and mock LLM")
+        print(f"Setup: {len(self.users)} users ready")
+
+    async def run(self, mix: dict):
+        names, weights = list(mix), list(mix.values())
+        in_flight = set()
+        interval = 1 / self.args.rps
+        started = time.perf_counter()
+        next_start = started
+        while next_start - started < self.args.duration:
+            await asyncio.sleep(max(0.0, next_start - time.perf_counter()))
+            if len(in_flight) >= self.args.max_in_flight:
+                self.skipped += 1
+            else:
+                scenario = random.choices(names, weights)[0]
+                task = asyncio.create_task(getattr(self, scenario)())
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            next_start += random.expovariate(1 / interval) if self.args.poisson else interval
+        offered = time.perf_counter() - started
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        return offered, time.perf_counter() - started
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    """Throughput and latency percentiles (ms) per scenario and overall."""
+    groups = {}
+    for result in results:
+        groups.setdefault(result["scenario"], []).append(result)
+    groups["all"] = [result for result in results if result["scenario"] != "valuation_job"]
+
+    summary = {}
+    for name, items in groups.items():
+        latencies = [item["latency"] * 1000 for item in items]
+        errors = {}
+        for item in items:
+            if not item["ok"]:
+                errors[item["error"]] = errors.get(item["error"], 0) + 1
+        summary[name] = {
+            "requests": len(items),
+            "ok": sum(1 for item in items if item["ok"]),
+            "throughput_rps": round(len(items) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            **{f"p{pct}_ms": round(percentile(latencies, pct), 1) for pct in (50, 90, 95, 99)},
+            "max_ms": round(max(latencies), 1) if latencies else 0.0,
+            "top_errors": dict(sorted(errors.items(), key=lambda item: -item[1])[:3]),
+        }
+    return summary
+
+
+def print_summary(summary: dict):
+    columns = ["requests", "ok", "throughput_rps", "mean_ms", "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms"]
+    print(f"{'scenario':<14}" + "".join(f"{column:>15}" for column in columns))
+    for name, stats in summary.items():
+        print(f"{name:<14}" + "".join(f"{stats[column]:>15}" for column in columns))
+    for name, stats in summary.items():
+        for error, count in stats["top_errors"].items():
+            if name != "all":
+                print(f"  {name}: {count} x {error}")
+
+
+async def main_async(args):
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        generator = LoadGenerator(client, args)
+        if set(mix) - {"generate"}:
+            await generator.setup()
+        offered, elapsed = await generator.run(mix)
+    summary = summarize(generator.results, offered)
+    print(f"Offered {args.rps} rps for {offered:.1f}s (drained after {elapsed:.1f}s); "
+          f"{generator.skipped} starts skipped at --max-in-flight")
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "skipped": generator.skipped, "summary": summary}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the API at a target request rate")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=5.0, help="Target request starts per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load after setup")
+    parser.add_argument("--mix", default="generate=1,answer=4,batch=2,fcff=1,valuation=1",
+                        help="Scenario weights, e.g. answer=5,fcff=1")
+    parser.add_argument("--poisson", action="store_true", help="Exponential gaps between starts instead of fixed ones")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="Starts beyond this many open requests are skipped")
+    parser.add_argument("--setup-users", type=int, default=5)
+    parser.add_argument("--num-questions", type=int, default=47)
+    parser.add_argument("--pdf-pages", type=int, default=10)
+    parser.add_argument("--pdf-variants", type=int, default=4, help="Distinct PDFs uploaded by the generate scenario")
+    parser.add_argument("--fast-path", action="store_true", help="Use the deterministic valuation pipeline")
+    parser.add_argument("--wait-jobs", action="store_true", help="Poll valuation jobs and report end-to-end latency")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="Write the summary as JSON")
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
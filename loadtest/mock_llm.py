@@ -0,0 +1,300 @@
+# mock_llm.py
+"""
+Local stand-in for Gemini, for load tests that must not hit the real API.
+
+Serves both protocols the backend uses:
+
+- OpenAI-compatible ``POST .../chat/completions`` (``core/FCFFprojection.py``,
+  ``core/startup_valuation.py``). Requests with ``tools`` get canned tool
+  calls built from the tools' JSON schemas: the first tool on the first turn,
+  every other tool in parallel on the second, then a final answer.
+  ``response_format=json_object`` requests get the keys listed in the prompt,
+  and the FCFF forecast prompt gets a valid 5-year projection.
+- Native genai ``POST /{version}/models/{model}:generateContent`` and
+  ``:streamGenerateContent`` (questions, reports, personas).
+
+Every response is delayed by a sample from a configurable latency
+distribution, and a fraction of requests can fail with 503 to exercise the
+gateway's retries.
+
+Usage::
+
+    python -m loadtest.mock_llm --port 8100 --latency lognormal:0.8,0.5
+
+    GEMINI_OPENAI_BASE_URL=http://127.0.0.1:8100/v1beta/openai \\
+    GEMINI_API_BASE_URL=http://127.0.0.1:8100 \\
+    LLM_CACHE_ENABLED=false uv run uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Mock LLM")
+
+settings = {
+    "chat_latency": ("lognormal", 0.8, 0.5),
+    "genai_latency": ("lognormal", 1.5, 0.5),
+    "error_rate": 0.0,
+    "stream_chunks": 8,
+    "responses": {},
+}
+
+QUESTION_COUNT_PATTERN = re.compile(r"generate (\d+) important questions")
+JSON_KEY_PATTERN = re.compile(r'^- "(\w+)": (.*)$', re.MULTILINE)
+EXAMPLE_PATTERN = re.compile(r"e\.g\. ([0-9.]+)\)")
+
+FCFF_METRICS = [
+    "revenues", "cost_of_goods_sold", "gross_profit", "operating_expenses", "ebitda",
+    "depreciation_amortization", "ebit", "nopat", "capex", "change_in_net_working_capital",
+    "fcff", "net_ppe", "gross_ppe",
+]
+
+
+def parse_latency(spec: str) -> tuple:
+    """
+    Parse a latency distribution: "fixed:S", "uniform:LOW,HIGH",
+    "lognormal:MEDIAN,SIGMA" or "exponential:MEAN" (seconds).
+    """
+    kind, _, params = spec.partition(":")
+    values = tuple(float(value) for value in params.split(",") if value)
+    expected = {"fixed": 1, "uniform": 2, "lognormal": 2, "exponential": 1}
+    if kind not in expected or len(values) != expected[kind]:
+        raise ValueError(f"Invalid latency spec: {spec}")
+    return (kind, *values)
+
+
+def sample_latency(distribution: tuple) -> float:
+    kind, *params = distribution
+    if kind == "fixed":
+        return params[0]
+    if kind == "uniform":
+        return random.uniform(*params)
+    if kind == "lognormal":
+        median, sigma = params
+        return median * random.lognormvariate(0, sigma)
+    return random.expovariate(1 / params[0]) if params[0] > 0 else 0.0
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text or "") // 4)
+
+
+def _example_value(schema: dict, name: str = ""):
+    """A plausible argument value for a JSON-schema property."""
+    kind = schema.get("type")
+    if kind == "array":
+        return [_example_value(schema.get("items", {}), name) for _ in range(5)]
+    if kind in ("number", "integer"):
+        if "rate" in name:
+            return 0.2
+        if "years" in name or "multiple" in name:
+            return 5
+        if name.endswith("_score"):
+            return 1.1
+        return 1_000_000
+    if kind == "boolean":
+        return True
+    if kind == "object":
+        return {key: _example_value(value, key) for key, value in schema.get("properties", {}).items()}
+    return "Startup"
+
+
+def _tool_call(tool: dict) -> dict:
+    function = tool["function"]
+    arguments = _example_value(function.get("parameters", {}))
+    return {
+        "id": f"call_{uuid.uuid4().hex[:12]}",
+        "type": "function",
+        "function": {"name": function["name"], "arguments": json.dumps(arguments)},
+    }
+
+
+def _json_inputs(prompt: str) -> dict:
+    # Keys are listed as `- "key": description` (core/startup_valuation.py:extract_valuation_inputs)
+    values = {}
+    for key, description in JSON_KEY_PATTERN.findall(prompt):
+        example = EXAMPLE_PATTERN.search(description)
+        if "One of" in description:
+            values[key] = "Startup"
+        elif description.startswith("List of"):
+            values[key] = [0.9, 0.85, 0.8, 0.75, 0.7]
+        elif example:
+            values[key] = float(example.group(1))
+        elif "integer" in description:
+            values[key] = 5
+        elif "multiple" in key:
+            values[key] = 8.0
+        elif "0-100" in description:
+            values[key] = 60
+        elif "0.5-1.5" in description:
+            values[key] = 1.1
+        elif "rate" in key:
+            values[key] = 0.2
+        else:
+            values[key] = 1_000_000
+    return values
+
+
+def _fcff_forecast() -> dict:
+    revenues = [1_000_000 * 1.3 ** year for year in range(5)]
+    projections = {metric: [round(value * 0.1 * (index + 1), 2) for value in revenues]
+                   for index, metric in enumerate(FCFF_METRICS)}
+    projections["revenues"] = [round(value, 2) for value in revenues]
+    return {
+        "assumptions": {
+            "revenue_growth_rate": 0.3, "cog_growth_rate": 0.25, "opex_growth_rate": 0.2,
+            "depreciation_rate": 0.1, "capex_rate": 0.05, "working_capital_rate": 0.1,
+            "tax_rate": 0.25, "terminal_growth_rate": 0.03,
+        },
+        "methodology": "Mock forecast with 30% revenue growth.",
+        "projections": projections,
+    }
+
+
+def chat_reply(body: dict) -> dict:
+    """The assistant message for a chat.completions request: content or tool calls."""
+    messages = body.get("messages") or []
+    prompt = "\n".join(str(message.get("content") or "") for message in messages if message.get("role") == "user")
+    tools = body.get("tools") or []
+    if tools and body.get("tool_choice") != "none":
+        tool_turns = sum(1 for message in messages if message.get("role") == "assistant" and message.get("tool_calls"))
+        if tool_turns == 0:
+            return {"role": "assistant", "content": None, "tool_calls": [_tool_call(tools[0])]}
+        if tool_turns == 1 and len(tools) > 1:
+            return {"role": "assistant", "content": None, "tool_calls": [_tool_call(tool) for tool in tools[1:]]}
+        return {"role": "assistant", "content": settings["responses"].get("valuation", "Mock valuation: EUR 2,500,000.")}
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        return {"role": "assistant", "content": json.dumps(_json_inputs(prompt))}
+    if "5-year financial forecast" in prompt and len(messages) == 1:
+        return {"role": "assistant", "content": json.dumps(_fcff_forecast())}
+    return {"role": "assistant", "content": settings["responses"].get("chat", "| **Revenue** | 1,000,000.00 |")}
+
+
+def genai_text(body: dict) -> str:
+    prompt = " ".join(part.get("text", "") for content in body.get("contents") or [] for part in content.get("parts") or [])
+    match = QUESTION_COUNT_PATTERN.search(prompt)
+    if match:
+        return "\n".join(f"{index}. Mock question {index} about the document?" for index in range(1, int(match.group(1)) + 1))
+    return settings["responses"].get("generate", "Mock analysis of the company. " * 40).strip()
+
+
+def _failure():
+    if random.random() < settings["error_rate"]:
+        error = {"error": {"code": 503, "message": "Mock overload", "status": "UNAVAILABLE"}}
+        return JSONResponse(status_code=503, content=error)
+    return None
+
+
+@app.post("/{prefix:path}/chat/completions")
+async def chat_completions(prefix: str, request: Request):
+    body = await request.json()
+    await asyncio.sleep(sample_latency(settings["chat_latency"]))
+    failure = _failure()
+    if failure:
+        return failure
+    message = chat_reply(body)
+    prompt_tokens = sum(estimate_tokens(json.dumps(message_in)) for message_in in body.get("messages") or [])
+    completion_tokens = estimate_tokens(message.get("content") or json.dumps(message.get("tool_calls")))
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _genai_chunk(text: str, prompt_tokens: int, finished: bool) -> dict:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    completion_tokens = estimate_tokens(text)
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": completion_tokens,
+            "totalTokenCount": prompt_tokens + completion_tokens,
+        },
+        "modelVersion": "mock",
+    }
+
+
+@app.post("/{version}/models/{target}")
+async def genai_models(version: str, target: str, request: Request):
+    model, _, method = target.partition(":")
+    body = await request.json()
+    prompt_tokens = estimate_tokens(json.dumps(body.get("contents")))
+    latency = sample_latency(settings["genai_latency"])
+    text = genai_text(body)
+
+    if method == "generateContent":
+        await asyncio.sleep(latency)
+        return _failure() or _genai_chunk(text, prompt_tokens, finished=True)
+    if method != "streamGenerateContent":
+        return JSONResponse(status_code=404, content={"error": {"code": 404, "message": f"Unknown method {method}"}})
+
+    # Time to first chunk is a fraction of the latency; the rest is spread over the chunks
+    chunks = max(1, settings["stream_chunks"])
+    size = -(-len(text) // chunks)
+    pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+    await asyncio.sleep(latency / (chunks + 1))
+    failure = _failure()
+    if failure:
+        return failure
+
+    async def events():
+        for index, piece in enumerate(pieces):
+            if index:
+                await asyncio.sleep(latency / (chunks + 1))
+            chunk = _genai_chunk(piece, prompt_tokens, finished=index == len(pieces) - 1)
+            yield f"data: {json.dumps(chunk)}\r\n\r\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible and genai LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", help="Latency for both protocols, e.g. fixed:0.2, uniform:0.1,0.5, "
+                                          "lognormal:0.8,0.5 (median, sigma) or exponential:0.5 (mean)")
+    parser.add_argument("--chat-latency", default="lognormal:0.8,0.5")
+    parser.add_argument("--genai-latency", default="lognormal:1.5,0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--stream-chunks", type=int, default=8)
+    parser.add_argument("--responses", help='JSON file overriding the canned texts ("chat", "generate", "valuation")')
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    settings["chat_latency"] = parse_latency(args.latency or args.chat_latency)
+    settings["genai_latency"] = parse_latency(args.latency or args.genai_latency)
+    settings["error_rate"] = args.error_rate
+    settings["stream_chunks"] = args.stream_chunks
+    if args.responses:
+        with open(args.responses) as f:
+            settings["responses"] = json.load(f)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
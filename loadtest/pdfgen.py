@@ -0,0 +1,71 @@
+# pdfgen.py
+"""
+Synthetic text PDFs for load tests and benchmarks, written without any PDF library.
+"""
+import random
+
+SENTENCES = [
+    "Revenue grew {pct}% year over year to EUR {amount} thousand.",
+    "Gross margin reached {pct}% while operating expenses were EUR {amount} thousand.",
+    "EBITDA for the period was EUR {amount} thousand with capex of EUR {small} thousand.",
+    "The company employs {small} people across its product, sales and operations teams.",
+    "The founders plan to raise EUR {amount} thousand to expand into {country}.",
+    "Customer acquisition cost fell {pct}% as the sales pipeline matured.",
+    "The product is protected by {small} patents and a proprietary data set.",
+    "Competitors in {country} include several well-funded incumbents.",
+]
+COUNTRIES = ["France", "Germany", "Spain", "Italy", "the Netherlands"]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def page_lines(page: int, lines: int, rng: random.Random) -> list:
+    result = [f"Page {page + 1}"]
+    for _ in range(lines - 1):
+        result.append(rng.choice(SENTENCES).format(
+            pct=rng.randint(1, 80), amount=rng.randint(100, 50_000),
+            small=rng.randint(2, 300), country=rng.choice(COUNTRIES),
+        ))
+    return result
+
+
+def synthetic_pdf(pages: int, lines_per_page: int = 40, seed: int = 0) -> bytes:
+    """
+    Build a PDF of `pages` pages of business-plan-like text that PyPDF2 can extract.
+
+    Args:
+        pages (int): Number of pages
+        lines_per_page (int): Text lines per page
+        seed (int): Random seed, so the same arguments give the same bytes (and PDF hash)
+
+    Returns:
+        bytes: The PDF file
+    """
+    rng = random.Random(seed)
+    # 1: catalog, 2: page tree, 3: font, then a (page, content stream) pair per page
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        text = " T* ".join(f"({_escape(line)}) Tj" for line in page_lines(page, lines_per_page, rng))
+        stream = f"BT /F1 10 Tf 12 TL 40 800 Td {text} ET".encode("latin-1")
+        page_number = len(objects) + 1
+        kids.append(f"{page_number} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_number + 1} 0 R >>".encode("latin-1")
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
@@ -1,64 +1,301 @@
 #main.py
-from fastapi import FastAPI, UploadFile, File, Form, Body
-from core.pdf_utils import extract_text_from_pdf
-from core.llm import generate_questions_from_text
-from db.crud import save_user_qa, update_answer_and_get_next
-from models.question import UserQA, QAItem, AnswerRequest
+from fastapi import FastAPI, UploadFile, File, Form, Body, Depends, Request
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse
+from core.pdf_utils import extract_text_from_pdf, hash_pdf_bytes, shutdown_process_pool
+from core.retrieval import index_pdf
+from core.llm import base_questions, missing_question_count, generate_document_questions
+from db.crud import save_user_qa, update_answer_and_get_next, update_answers_and_get_next, append_questions
+from models.question import UserQA, QAItem, AnswerRequest, BatchAnswerRequest
 import io
-from core.startup_valuation import perform_startup_valuation
-from core.generate_report_llm import generate_report
+import json
+import asyncio
+from core.startup_valuation import perform_startup_valuation, perform_deterministic_valuation
+from core.generate_report_llm import generate_report, generate_report_stream
 from core.fetch_data_by_id import fetch_data_by_id
-from core.FCFFprojection import perform_fcff_projection
+from core.FCFFprojection import perform_fcff_projection, perform_sensitivity_analysis
 from bson import ObjectId
-from db.crud import save_pdf_text
+from db.crud import save_pdf_text, get_pdf_blob_text, save_pdf_blob
 from pydantic import BaseModel
+from typing import Optional, Union
+from core.valuation_simulation import run_monte_carlo_valuation
+from contextlib import asynccontextmanager
+from core.llm_gateway import close_clients
+from db.mongodb import close_clients as close_mongo_clients
+from db.indexes import ensure_indexes
+from core.config import MAX_QUESTIONS, MONGO_ENSURE_INDEXES
+from core import metrics
+from core.jobs import JobQueue, QueueFull, get_job_store
+from core.report_agent.agent import process_personas, iter_personas
 
-app = FastAPI()
+job_queue = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global job_queue
+    if MONGO_ENSURE_INDEXES:
+        try:
+            await asyncio.to_thread(ensure_indexes)
+        except Exception as e:
+            # Queries still work without indexes; don't refuse to start
+            print(f"Error ensuring indexes: {str(e)}")
+    # Long-running endpoints hand their work to this bounded worker pool
+    job_queue = JobQueue(get_job_store())
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    # Release the pooled LLM connections shared by all requests
+    await close_clients()
+    await close_mongo_clients()
+    shutdown_process_pool()
+
+async def label_endpoint(request: Request):
+    # Route template (not the raw path) keeps the metrics label cardinality bounded
+    route = request.scope.get("route")
+    metrics.current_endpoint.set(getattr(route, "path", request.url.path))
+
+app = FastAPI(lifespan=lifespan, dependencies=[Depends(label_endpoint)])
 
 class FCFFRequest(BaseModel):
     pdf_id: str
     userMSG: str
 
+class SensitivityRequest(BaseModel):
+    pdf_id: str
+    discount_rates: list[float]
+    terminal_growth_rates: Optional[list[float]] = None
+    exit_multiples: Optional[list[float]] = None
+
 class ValuationRequest(BaseModel):
     pdf_id: str
     user_id: str
-@app.post("/api/v1/valuation")
+    # Deterministic pipeline instead of the tool-calling agent; inputs holds any known stage/scores/rates
+    fast_path: bool = False
+    inputs: Optional[dict] = None
+# A number (held constant) or a distribution spec, see core/valuation_simulation.py
+DistributionSpec = Union[float, dict]
+
+class MonteCarloRequest(BaseModel):
+    free_cash_flows: list[float]
+    survival_rates: list[float]
+    final_year_ebitda: DistributionSpec
+    discount_rate: DistributionSpec
+    long_term_growth_rate: DistributionSpec
+    industry_multiple: DistributionSpec
+    exit_multiple: DistributionSpec
+    expected_roi: DistributionSpec
+    years_to_exit: int = 5
+    capital_raised: float = 0
+    survival_rate_std: float = 0.0
+    cash_flow_scale: DistributionSpec = 1.0
+    weights: Optional[dict] = None
+    fixed_valuations: Optional[dict] = None
+    n_draws: int = 100_000
+    seed: Optional[int] = None
+
+async def submit_job(kind: str, factory, params: dict):
+    """Queue a job and answer 202 with its id, or 503 when the queue is full."""
+    try:
+        job_id = await job_queue.submit(kind, factory, params)
+    except QueueFull as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    return JSONResponse(status_code=202, content={
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/v1/jobs/{job_id}"
+    })
+
+@app.post("/api/v1/valuation", status_code=202)
 async def valuation(request: ValuationRequest):
-    result = perform_startup_valuation(request.pdf_id,request.user_id)
+    async def run():
+        if request.fast_path:
+            result = await perform_deterministic_valuation(request.pdf_id, request.user_id, request.inputs)
+        else:
+            result = await perform_startup_valuation(request.pdf_id,request.user_id)
+        return {"result": result}
+    return await submit_job("valuation", run, request.model_dump())
+
+@app.post("/api/v1/valuation/monte-carlo")
+async def monte_carlo_valuation(request: MonteCarloRequest):
+    try:
+        # CPU-bound NumPy work; run it off the event loop
+        result = await asyncio.to_thread(run_monte_carlo_valuation, **request.model_dump())
+    except (ValueError, KeyError, TypeError) as e:
+        # TypeError: wrongly typed values inside weights, fixed_valuations or a distribution spec
+        return {"error": f"Invalid simulation input: {str(e)}"}
     return {"result": result}
 
 @app.post("/api/v1/questions/generate")
-async def generate_questions(user_id: str = Form(...), pdf: UploadFile = File(...)):
+async def generate_questions(user_id: str = Form(...), pdf: UploadFile = File(...), num_questions: int = Form(47, ge=1, le=MAX_QUESTIONS)):
     pdf_bytes = await pdf.read()
-    text = extract_text_from_pdf(io.BytesIO(pdf_bytes))
+    pdf_hash = hash_pdf_bytes(pdf_bytes)
+    # Re-uploads of the same document reuse the stored text instead of re-parsing;
+    # the blob reads and writes are blocking pymongo/GridFS calls
+    text = await asyncio.to_thread(get_pdf_blob_text, pdf_hash)
+    if text is None:
+        # Extraction is CPU-bound; keep it off the event loop
+        text = await asyncio.to_thread(extract_text_from_pdf, io.BytesIO(pdf_bytes))
+        await asyncio.to_thread(save_pdf_blob, pdf_hash, text)
+        # Chunk and index once per document for the personas and the FCFF prompt
+        await asyncio.to_thread(index_pdf, pdf_hash, text)
     
     # Save pdf_text separately
-    pdf_id = save_pdf_text(user_id, text)
+    pdf_id = await asyncio.to_thread(save_pdf_text, user_id, pdf_hash)
 
-    # Continue with QA flow
-    questions = generate_questions_from_text(text)
+    # Continue with QA flow: the fixed questionnaire is returned right away
+    questions = base_questions(num_questions)
     qa_items = [QAItem(question=q) for q in questions]
     user_qa = UserQA(user_id=user_id, qas=qa_items)
-    save_user_qa(user_qa,pdf_id)
+    generation = await asyncio.to_thread(save_user_qa, user_qa, pdf_id)
 
-    return {"user_id": user_id, "pdf_id": pdf_id, "question_index": 0, "question": questions[0] if questions else None}
+    response = {"user_id": user_id, "pdf_id": pdf_id, "question_index": 0, "question": questions[0] if questions else None}
+    # Only call the LLM when it has questions to add; they are appended in the background
+    pending = missing_question_count(num_questions)
+    if pending:
+        async def add_document_questions():
+            extra = await generate_document_questions(text, pending)
+            # A newer upload replaces the questionnaire under the same pdf_id; its generation no longer matches
+            if not await asyncio.to_thread(append_questions, user_id, pdf_id, generation, extra):
+                return {"added_questions": 0, "superseded": True}
+            return {"added_questions": len(extra)}
+        try:
+            response["questions_job_id"] = await job_queue.submit("questions", add_document_questions, {"user_id": user_id, "pdf_id": pdf_id})
+            response["pending_questions"] = pending
+        except QueueFull as e:
+            print(f"Skipping document questions for {pdf_id}: {str(e)}")
+    return response
 
 @app.post("/api/v1/questions/answer")
 async def answer_question(req: AnswerRequest):
-    next_index, next_question = update_answer_and_get_next(req.user_id,req.pdf_id, req.question_index, req.answer)
+    next_index, next_question = await asyncio.to_thread(
+        update_answer_and_get_next, req.user_id, req.pdf_id, req.question_index, req.answer
+    )
     if next_question is not None:
         return {"user_id": req.user_id, "question_index": next_index, "question": next_question,"pdf_id": req.pdf_id,"all_questions_answered": False}
     else:
         return {"user_id": req.user_id,"pdf_id": req.pdf_id,"all_questions_answered": True, "message": "All questions answered!"}
     
-@app.get("/generate-report/{doc_id}")
-def generate_llm_report(doc_id: str):
-    eval_text, pdf_text = fetch_data_by_id(ObjectId(doc_id))
-    if not eval_text or not pdf_text:
-        return {"error": "Missing data in document"}
-    
-    report = generate_report(eval_text, pdf_text)
-    return {"report": report}
+@app.post("/api/v1/questions/answers:batch")
+async def answer_questions_batch(req: BatchAnswerRequest):
+    """
+    Apply many answers for a (user_id, pdf_id) in one update.
+
+    Returns:
+        dict: The next unanswered question (if any), answered/total counts and
+            the completion state
+    """
+    result = await asyncio.to_thread(
+        update_answers_and_get_next, req.user_id, req.pdf_id,
+        [(item.question_index, item.answer) for item in req.answers]
+    )
+    if "error" in result:
+        return {"error": result["error"]}
+    response = {
+        "user_id": req.user_id,
+        "pdf_id": req.pdf_id,
+        "answered_count": result["answered_count"],
+        "question_count": result["question_count"],
+        "all_questions_answered": result["next_index"] is None
+    }
+    if result["next_index"] is not None:
+        response.update({"question_index": result["next_index"], "question": result["next_question"]})
+    else:
+        response["message"] = "All questions answered!"
+    return response
+
+@app.get("/generate-report/{doc_id}", status_code=202)
+async def generate_llm_report(doc_id: str):
+    if not ObjectId.is_valid(doc_id):
+        return JSONResponse(status_code=400, content={"error": "Invalid document id"})
+
+    async def run():
+        eval_text, pdf_text = await asyncio.to_thread(fetch_data_by_id, ObjectId(doc_id))
+        if not eval_text or not pdf_text:
+            return {"error": "Missing data in document"}
+        report = await generate_report(eval_text, pdf_text)
+        return {"report": report}
+    return await submit_job("report", run, {"doc_id": doc_id})
+
+@app.post("/api/v1/reports/personas/{user_id}", status_code=202)
+async def generate_persona_reports(user_id: str):
+    """Run every report persona against the user's documents and answers as a background job."""
+    return await submit_job("personas", lambda: process_personas(user_id), {"user_id": user_id})
+
+def sse_event(event: str, data) -> str:
+    # One server-sent event; data is JSON so multi-line text stays on a single data: line
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # Stop nginx-style proxies from buffering the stream
+        "X-Accel-Buffering": "no"
+    })
+
+@app.get("/generate-report/{doc_id}/stream")
+async def stream_llm_report(doc_id: str):
+    """
+    Streaming variant of /generate-report/{doc_id}.
+
+    Emits "token" events ({"text": chunk}) while the report is generated, then
+    "done" ({"report": full text}), or a single "error" event.
+    """
+    if not ObjectId.is_valid(doc_id):
+        return JSONResponse(status_code=400, content={"error": "Invalid document id"})
+
+    async def events():
+        eval_text, pdf_text = await asyncio.to_thread(fetch_data_by_id, ObjectId(doc_id))
+        if not eval_text or not pdf_text:
+            yield sse_event("error", {"error": "Missing data in document"})
+            return
+        parts = []
+        try:
+            async for chunk in generate_report_stream(eval_text, pdf_text):
+                parts.append(chunk)
+                yield sse_event("token", {"text": chunk})
+        except Exception as e:
+            yield sse_event("error", {"error": f"Error generating report: {str(e)}"})
+            return
+        yield sse_event("done", {"report": "".join(parts)})
+    return sse_response(events())
+
+@app.get("/api/v1/reports/personas/{user_id}/stream")
+async def stream_persona_reports(user_id: str):
+    """
+    Run the report personas and emit one "persona" event per persona as it
+    finishes (completion order, not persona order), then "done".
+    """
+    async def events():
+        count = 0
+        async for result in iter_personas(user_id):
+            count += 1
+            yield sse_event("persona", result)
+        yield sse_event("done", {"count": count})
+    return sse_response(events())
+
+@app.get("/api/v1/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Poll a background job.
+
+    Returns:
+        dict: job_id, kind, status (queued/running/succeeded/failed/cancelled),
+            timestamps, and the result or error once finished
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    job["job_id"] = job.pop("_id")
+    return job
+
+@app.delete("/api/v1/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job."""
+    if not await job_queue.cancel(job_id):
+        job = await job_queue.get(job_id)
+        if job is None:
+            return JSONResponse(status_code=404, content={"error": "Job not found"})
+        return JSONResponse(status_code=409, content={"error": f"Job already {job['status']}"})
+    return {"job_id": job_id, "status": "cancelled"}
 
 @app.post("/api/v1/fcff-projection/")
 async def get_fcff_projection(request: FCFFRequest):
@@ -72,13 +309,32 @@ async def get_fcff_projection(request: FCFFRequest):
         dict: FCFF projection results including the formatted table
     """
     try:
-        result = perform_fcff_projection(request.pdf_id, request.userMSG)
+        result = await perform_fcff_projection(request.pdf_id, request.userMSG)
         if "error" in result:
             return {"error": result["error"]}
         return result
     except Exception as e:
         return {"error": f"Error processing FCFF projection: {str(e)}"}
 
+@app.post("/api/v1/fcff-projection/sensitivity")
+async def get_fcff_sensitivity(request: SensitivityRequest):
+    """
+    DCF sensitivity table (WACC x terminal growth and/or WACC x exit multiple)
+    computed locally from the approved FCFF projection.
+    """
+    return await asyncio.to_thread(
+        perform_sensitivity_analysis,
+        request.pdf_id,
+        request.discount_rates,
+        request.terminal_growth_rates,
+        request.exit_multiples
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """LLM latency, token, retry, error and agent-turn metrics in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
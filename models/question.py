@@ -15,4 +15,13 @@ class AnswerRequest(BaseModel):
     pdf_id: str
     question_index: int
     answer: str
-    pdf_id: str
\ No newline at end of file
+    pdf_id: str
+
+class BatchAnswerItem(BaseModel):
+    question_index: int
+    answer: str
+
+class BatchAnswerRequest(BaseModel):
+    user_id: str
+    pdf_id: str
+    answers: List[BatchAnswerItem]